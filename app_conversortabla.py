@@ -1,9 +1,21 @@
 import streamlit as st
-import pandas as pd
+import streamlit.components.v1 as components   # ya lo carga `import streamlit`: no suma al arranque
 import json
-import re
-from html import escape as html_escape
-import streamlit.components.v1 as components
+import io
+import hashlib
+import os
+from contextlib import nullcontext
+from conversor_core import (
+    LOGICAL_FIELDS, DEFAULT_EXPECTED, DEFAULT_HEADERS_LABELS, WorkbookCache, OutputCache, IncrementalRenderer,
+    labelize, safe_index, best_default, ensure_unique_order, missing_required,
+    INPUT_FORMATS, input_format, available_engines, resolve_engine,
+    read_header, read_all_sheets, mapped_positions, read_mapped_columns,
+    apply_column_mapping, normalize_date_column, DateIndex, WEEKDAYS_ES, complete_link_columns,
+    make_style, render_outputs, html_size_report, clipboard_payload,
+    CODE_INLINE_MAX_BYTES, CODE_HIGHLIGHT_MAX_BYTES, code_head, build_config_dict,
+    PREVIEW_ROWS_DEFAULT, preview_bounds,
+    prepare_sheet, render_sheets, zip_outputs,
+)
 
 st.set_page_config(page_title="Generador de Tabla HTML igual a Canvas LMS", page_icon="🧱", layout="centered")
 st.title("Generador de Tabla HTML igual a Canvas LMS")
@@ -16,239 +28,102 @@ if "texto_html" not in st.session_state:
 if "loaded_template" not in st.session_state:
     st.session_state["loaded_template"] = False
 
-def _append_snippet(snippet: str):
-    st.session_state["texto_html"] = (st.session_state.get("texto_html", "") or "") + snippet
-
-# =========================
-# Constantes / Utilidades
-# =========================
-LOGICAL_FIELDS = [
-    "Unidad Didáctica",
-    "Tema del encuentro",
-    "Duración",
-    "Fecha de realización",
-    "Enlace de Conexión",
-    "Enlace de Grabación",
-]
-
-DEFAULT_EXPECTED = {
-    "Unidad Didáctica": "Unidad Didáctica",
-    "Tema del encuentro": "Tema del encuentro",
-    "Duración": "Duración ",
-    "Fecha de realización": "Fecha  de realización",
-    "Enlace de Conexión": "Enlace de Conexión",
-    "Enlace de Grabación": "Enlace de Grabación",
-}
-
-DEFAULT_HEADERS_LABELS = {
-    "Unidad Didáctica": "Unidad Didáctica",
-    "Tema del encuentro": "Tema del encuentro",
-    "Duración": "Duración",
-    "Fecha de realización": "Fecha de realización",
-    "Enlace de Conexión": "Enlace de Conexión",
-    "Enlace de Grabación": "Enlace de Grabación",
-}
-
-def labelize(x) -> str:
-    try:
-        s = str(x)
-    except Exception:
-        s = repr(x)
-    return s
-
-def safe_index(seq, value):
-    try:
-        return seq.index(value)
-    except ValueError:
-        return 0
-
-def best_default(colnames, target):
-    """Mejor coincidencia de nombre de columna. Soporta cabeceras no-string."""
-    def norm_one(x):
-        s = str(x)
-        return " ".join(s.strip().lower().split())
-
-    aliases = {"duración ": "duración", "fecha  de realización": "fecha de realización"}
-    target_norm = norm_one(aliases.get(target, target))
-
-    for orig in colnames:
-        if norm_one(orig) == target_norm:
-            return orig
-
-    hints = {
-        "Unidad Didáctica": ["unidad"],
-        "Tema del encuentro": ["tema"],
-        "Duración": ["duración", "duracion"],
-        "Fecha de realización": ["fecha"],
-        "Enlace de Conexión": ["conexión", "conexion", "enlace"],
-        "Enlace de Grabación": ["grabación", "grabacion"],
-    }
-    for orig in colnames:
-        n = norm_one(orig)
-        for h in hints.get(target, []):
-            if h in n:
-                return orig
-    return None
-
-def ensure_unique_order(order_list):
-    if sorted(order_list) != sorted(LOGICAL_FIELDS):
-        return LOGICAL_FIELDS[:]
-    if len(set(order_list)) != len(order_list):
-        return LOGICAL_FIELDS[:]
-    return order_list
-
-# ====== Estilos (color + fuente + compacto + alineación + bordes) ======
-def make_style(primary="#ba372a", compact=False, font_family="Arial, Helvetica, sans-serif",
-               tema_left=False, show_th_borders=True, show_td_borders=True):
-    th_border = f"1px solid {primary}" if show_th_borders else "0"
-    td_border = f"1px solid {primary}" if show_td_borders else "0"
-    return {
-        "primary": primary,
-        "font": font_family,
-        "title_size": "14pt" if compact else "16pt",
-        "header_font": "11pt" if compact else "12pt",
-        "cell_font": "10pt" if compact else "11pt",
-        "padding": "4px" if compact else "8px",
-        "tema_main": "11pt" if compact else "11.5pt",
-        "tema_sub": "9.5pt" if compact else "10pt",
-        "tema_align": "left" if tema_left else "center",
-        "cell_align_default": "center",
-        "th_border": th_border,
-        "td_border": td_border,
-    }
-
-# ====== Protección de tabla: sanear y encapsular bloque de usuario ======
-SAFE_TAG_WHITELIST = {"strong","em","b","i","u","a","p","br","hr","ul","ol","li","h1","h2","h3","h4","h5","h6"}
-
-def sanitize_user_html(raw: str) -> str:
-    """Escapa etiquetas peligrosas (table, tr, td, style, script, etc.) y permite solo etiquetas de texto básicas."""
-    if not raw:
-        return ""
-    raw = re.sub(r"(?is)<\s*(script|style)\b.*?</\s*\1\s*>", "", raw)
-
-    def _repl_open(m):
-        tag_full = m.group(0)
-        tag_name = (m.group(1) or "").split()[0].lower().strip("/ ")
-        return tag_full if tag_name in SAFE_TAG_WHITELIST else tag_full.replace("<", "&lt;").replace(">", "&gt;")
-
-    def _repl_close(m):
-        tag_full = m.group(0)
-        tag_name = (m.group(1) or "").lower().strip()
-        return tag_full if tag_name in SAFE_TAG_WHITELIST else tag_full.replace("<", "&lt;").replace(">", "&gt;")
-
-    raw = re.sub(r"<\s*([a-zA-Z0-9]+)([^>]*)>", _repl_open, raw)
-    raw = re.sub(r"</\s*([a-zA-Z0-9]+)\s*>", _repl_close, raw)
-    return raw
-
-def wrap_user_block(html_text: str, font_family: str) -> str:
-    """Aísla el bloque del usuario en un contenedor propio para no afectar la tabla."""
-    if not html_text:
-        return ""
-    return (
-        f"<div style=\\"margin: 0 0 12px 0; font-family:{font_family}; color:#404e5c; font-size:11pt;\\">"
-        f"{html_text}"
-        f"</div>"
-    )
-
-def render_cell_html(lfield, row, style):
-    import pandas as _pd
-    if lfield == "Tema del encuentro":
-        tema_val = "" if _pd.isna(row.get(lfield, "")) else str(row.get(lfield, ""))
-        partes = tema_val.split("\\n", 1)
-        if len(partes) == 2:
-            tema_principal = partes[0].strip()
-            tema_sub = partes[1].strip()
-            return (
-                f'<span style="font-weight: bold; color: #404e5c; font-size: {style["tema_main"]};">{tema_principal}</span><br>'
-                f'<span style="color: #7b858d; font-size: {style["tema_sub"]};">{tema_sub}</span>'
-            )
-        else:
-            return f'<span style="font-weight: bold; color: #404e5c; font-size: {style["tema_main"]};">{tema_val}</span>'
-
-    if lfield == "Enlace de Conexión":
-        val = str(row.get(lfield, "") or "").strip()
-        if val:
-            icono_flecha = '&#8594;'
-            return (
-                f'<a href="{val}" target="_blank" '
-                f'style="color: {style["primary"]}; font-weight: bold; text-decoration: underline; '
-                f'font-family: {style["font"]}; font-size: {style["cell_font"]};">'
-                f'ENLACE <span style="font-size:10pt;">{icono_flecha}</span></a>'
-            )
-        return ""
-
-    if lfield == "Enlace de Grabación":
-        return (f'<span style="color: #404e5c; font-weight: bold; '
-                f'font-family: {style["font"]}; font-size: {style["cell_font"]};">GRABACIÓN</span>')
-
-    return str(row.get(lfield, "") if pd.notna(row.get(lfield, "")) else "")
-
-def generar_tabla_html(df_disp, titulo, headers_by_logical, order_list, hidden_set, texto_extra, style, proteger_tabla):
-    """Devuelve (html_completo, html_solo_tabla)."""
-    # --- bloque del usuario, saneado/encapsulado ---
-    user_block = sanitize_user_html(texto_extra) if proteger_tabla else (texto_extra or "")
-    user_block = wrap_user_block(user_block, style["font"]) if user_block else ""
-
-    # --- título ---
-    title_html = f"""
-    <p style="text-align: left;">
-        <span style="font-family: {style["font"]}; color: #000000; font-size: {style["title_size"]}; font-weight: bold;">
-            {titulo}
-        </span>
-    </p>
-    """
+# ====== Carga de Excel con caché (hash de contenido + LRU/TTL + techo de bytes) ======
+@st.cache_resource
+def get_workbook_cache():
+    return WorkbookCache()
+
+@st.cache_resource
+def get_output_cache():
+    return OutputCache()
+
+@st.cache_resource
+def get_sheet_output_cache():
+    """Caché propia del modo varias hojas: una entrada por hoja, acotada por el mismo techo de bytes."""
+    return OutputCache(max_entries=256)
+
+def cache_stats_caption(label, cache):
+    """Aciertos, fallos y memoria de una caché (LRUCache.stats()), como nota al pie."""
+    stats = cache.stats()
+    st.caption(f"{label}: {stats['hits']:,} aciertos, {stats['misses']:,} fallos · {stats['entries']} entradas, "
+               f"{stats['bytes'] / 2**20:,.1f} de {cache.max_bytes / 2**20:,.0f} MB.")
+
+def get_renderer():
+    """Renderizador incremental de la sesión (uno solo; su memoria tiene techo, ver IncrementalRenderer)."""
+    return st.session_state.setdefault("incremental_renderer", IncrementalRenderer())
+
+def upload_digest(uploaded_file):
+    """sha256 del archivo subido; se calcula una vez por subida (file_id), no en cada lectura ni rerun."""
+    cached = st.session_state.get("digest_subida")
+    if cached is None or cached[0] != uploaded_file.file_id:
+        cached = (uploaded_file.file_id, hashlib.sha256(uploaded_file.getvalue()).hexdigest())
+        st.session_state["digest_subida"] = cached
+    return cached[1]
+
+def _cached_read(uploaded_file, what, sheet_name, engine, read):
+    fmt = input_format(uploaded_file.name)
+    key = (upload_digest(uploaded_file), fmt, sheet_name, resolve_engine(engine, fmt), what)
+    return get_workbook_cache().get_or_compute(key, lambda: read(io.BytesIO(uploaded_file.getvalue())))
+
+def read_workbook_header(uploaded_file, sheet_name=0, engine="auto"):
+    """Encabezados del archivo subido (solo la primera fila o el esquema), para el mapeo del Paso 1."""
+    fmt = input_format(uploaded_file.name)
+    return list(_cached_read(uploaded_file, "header", sheet_name, engine,
+                             lambda src: read_header(src, sheet_name=sheet_name, engine=engine, fmt=fmt)).columns)
+
+def read_workbook(uploaded_file, colnames, map_cols, sheet_name=0, engine="auto"):
+    """Lee solo las columnas mapeadas, reutilizando el DataFrame si el contenido y el mapeo no cambiaron."""
+    fmt = input_format(uploaded_file.name)
+    positions = tuple(mapped_positions(colnames, map_cols))
+    return _cached_read(uploaded_file, positions, sheet_name, engine,
+                        lambda src: read_mapped_columns(src, colnames, map_cols, sheet_name=sheet_name,
+                                                        engine=engine, fmt=fmt))
+
+def read_workbook_sheets(uploaded_file, engine="auto"):
+    """Todas las hojas del libro subido ({hoja: DataFrame}), leídas en una sola pasada."""
+    fmt = input_format(uploaded_file.name)
+    return _cached_read(uploaded_file, "all_sheets", None, engine,
+                        lambda src: read_all_sheets(src, engine=engine, fmt=fmt))
+
+# ====== Vistas previas acotadas (solo se envía al navegador una página de filas) ======
+def paged_preview(df, key):
+    """Porción de `df` para una vista previa, con selector de página e indicador de filas mostradas."""
+    total = len(df)
+    page_size = st.session_state.get("preview_rows", PREVIEW_ROWS_DEFAULT)
+    pages = preview_bounds(total, page_size)[2]
+    page = 1
+    if pages > 1:
+        # la página vive solo en session_state (sin value=, que choca con fijarla aquí)
+        if st.session_state.setdefault(key, 1) > pages:
+            st.session_state[key] = pages
+        page = st.number_input(f"Página (de {pages:,})", min_value=1, max_value=pages, step=1, key=key)
+    start, stop, _ = preview_bounds(total, page_size, page)
+    if total:
+        st.caption(f"Filas mostradas: {start + 1:,}–{stop:,} de {total:,}")
+    return df.iloc[start:stop]
+
+TEMPLATE_WIDGET_KEYS = (
+    ["titulo_principal"]
+    + [f"hdr_{k}" for k in ("ud", "tema", "dur", "fecha", "enlace", "grab")]
+    + [f"ord{i}" for i in range(1, 7)]
+    + [f"hide_{k}" for k in ("ud", "tema", "dur", "fecha", "enlace", "grab")]
+)
 
-    # --- tabla (SOLO la tabla) ---
-    outer_border = f"1px solid {style['primary']}"
-    table_html = f'<table style="border-collapse: collapse; width: 100%; border: {outer_border};">\\n<tr>\\n'
-    for lfield in order_list:
-        if lfield in hidden_set:
-            continue
-        label = headers_by_logical.get(lfield, lfield)
-        table_html += (
-            f'<th style="background-color: {style["primary"]}; color: #fff; text-align: center; '
-            f'font-family: {style["font"]}; font-size: {style["header_font"]}; font-weight: bold; '
-            f'padding: {style["padding"]}; border: {style["th_border"]};">{label}</th>\\n'
-        )
-    table_html += "</tr>\\n"
-
-    for _, row in df_disp.iterrows():
-        table_html += "<tr>\\n"
-        for lfield in order_list:
-            if lfield in hidden_set:
-                continue
-            cell_html = render_cell_html(lfield, row, style)
-            align = style["tema_align"] if lfield == "Tema del encuentro" else style["cell_align_default"]
-            table_html += (
-                f'<td style="text-align: {align}; font-family: {style["font"]}; '
-                f'font-size: {style["cell_font"]}; color: #404e5c; border: {style["td_border"]}; '
-                f'padding: {style["padding"]};">{cell_html}</td>\\n'
-            )
-        table_html += "</tr>\\n"
-    table_html += "</table>"
-
-    # --- html completo ---
-    full_html = (user_block or "") + title_html + table_html
-    return full_html, table_html
-
-def build_config_dict(map_cols, header_labels_by_logical, display_order, hidden_columns, titulo_principal,
-                      texto_html, primary, compact, font_family, tema_left, proteger_tabla,
-                      show_th_borders, show_td_borders):
-    return {
-        "map_cols": map_cols,
-        "header_labels": header_labels_by_logical,
-        "display_order": display_order,
-        "hidden_columns": list(hidden_columns),
-        "titulo_principal": titulo_principal,
-        "texto_html": texto_html,
-        "primary_color": primary,
-        "compact_mode": compact,
-        "font_family": font_family,
-        "tema_align_left": tema_left,
-        "protect_table": proteger_tabla,
-        "show_th_borders": show_th_borders,
-        "show_td_borders": show_td_borders,
-    }
+# ====== Visores de código (el HTML completo solo viaja al navegador si se pide) ======
+def code_viewer(html_text, n_rows, key):
+    """st.code del HTML; si es grande muestra la cabecera con tamaño y filas, y el resto a pedido."""
+    size = len(html_text.encode("utf-8"))
+    if size <= CODE_INLINE_MAX_BYTES:
+        st.code(html_text, language="html")
+        return
+    st.caption(f"{size:,} bytes · {n_rows:,} filas")
+    if st.toggle("Mostrar el código completo", key=key):
+        highlight = size <= CODE_HIGHLIGHT_MAX_BYTES
+        if not highlight:
+            st.caption(f"Resaltado de sintaxis desactivado por encima de {CODE_HIGHLIGHT_MAX_BYTES // 1024:,} KB.")
+        st.code(html_text, language="html" if highlight else None)
+    else:
+        st.code(code_head(html_text) + "\n<!-- … -->", language="html")
 
 def apply_loaded_template(conf):
     st.session_state["tpl_map_cols"] = conf.get("map_cols", {})
@@ -257,6 +132,7 @@ def apply_loaded_template(conf):
     st.session_state["tpl_hidden_columns"] = set(conf.get("hidden_columns", []))
     st.session_state["tpl_titulo_principal"] = conf.get("titulo_principal", "Programación de encuentros sincrónicos")
     st.session_state["texto_html"] = conf.get("texto_html", "")
+    st.session_state["texto_html_version"] = st.session_state.get("texto_html_version", 0) + 1
     st.session_state["tpl_primary_color"] = conf.get("primary_color", "#ba372a")
     st.session_state["tpl_compact_mode"] = bool(conf.get("compact_mode", False))
     st.session_state["tpl_font_family"] = conf.get("font_family", "Arial, Helvetica, sans-serif")
@@ -264,7 +140,11 @@ def apply_loaded_template(conf):
     st.session_state["tpl_protect_table"] = bool(conf.get("protect_table", True))
     st.session_state["tpl_show_th_borders"] = bool(conf.get("show_th_borders", True))
     st.session_state["tpl_show_td_borders"] = bool(conf.get("show_td_borders", True))
+    st.session_state["tpl_compact_html"] = bool(conf.get("compact_html", False))
     st.session_state["loaded_template"] = True
+    # los controles con clave conservan su valor; se descartan para que tomen los de la plantilla
+    for key in TEMPLATE_WIDGET_KEYS:
+        st.session_state.pop(key, None)
 
 # =========================
 # Cargar / Guardar plantilla
@@ -275,73 +155,79 @@ with st.expander("📦 Plantillas de configuración (opcional)"):
     tpl_upl = st.file_uploader("Cargar plantilla (.json)", type=["json"], key="tpl_json_uploader_v3")
     if tpl_upl is not None:
         try:
-            conf = json.load(tpl_upl)
-            apply_loaded_template(conf)
+            tpl_digest = hashlib.sha256(tpl_upl.getvalue()).hexdigest()
+            if st.session_state.get("tpl_digest") != tpl_digest:
+                apply_loaded_template(json.load(tpl_upl))
+                st.session_state["tpl_digest"] = tpl_digest
             st.success("Plantilla cargada. Los controles se han ajustado con la configuración.")
         except Exception as e:
             st.error(f"No se pudo leer la plantilla: {e}")
 
-# =========================
-# Apariencia: color, fuente, compacto, alineación y bordes
-# =========================
-st.markdown("### Apariencia")
-default_primary = st.session_state.get("tpl_primary_color", "#ba372a")
-primary_color = st.color_picker("Color institucional (encabezados, bordes y enlaces)", value=default_primary)
-
-font_options = {
-    "Arial (segura)": "Arial, Helvetica, sans-serif",
-    "Roboto (moderna)": "Roboto, Arial, sans-serif",
-    "Georgia (serif)": "Georgia, serif",
-    "Times New Roman (serif)": "'Times New Roman', Times, serif",
-}
-default_font_label = next((k for k, v in font_options.items()
-                           if v == st.session_state.get("tpl_font_family", "Arial, Helvetica, sans-serif")), "Arial (segura)")
-font_label = st.selectbox("Tipografía", options=list(font_options.keys()),
-                          index=list(font_options.keys()).index(default_font_label))
-font_family = font_options[font_label]
-
-default_compact = bool(st.session_state.get("tpl_compact_mode", False))
-compact_mode = st.checkbox("Modo compacto (tipografía y celdas más pequeñas)", value=default_compact)
-
-tema_left_default = bool(st.session_state.get("tpl_tema_left", False))
-tema_left = st.checkbox("Alinear a la izquierda solo la columna “Tema del encuentro”", value=tema_left_default)
-
-protect_table_default = bool(st.session_state.get("tpl_protect_table", True))
-proteger_tabla = st.checkbox("Proteger tabla (sanear HTML conflictivo del bloque superior)", value=protect_table_default)
-
-# toggles bordes separados
-show_th_borders_default = bool(st.session_state.get("tpl_show_th_borders", True))
-show_td_borders_default = bool(st.session_state.get("tpl_show_td_borders", True))
-col_b1, col_b2 = st.columns(2)
-with col_b1:
-    show_th_borders = st.checkbox("Líneas internas en cabecera (th)", value=show_th_borders_default)
-with col_b2:
-    show_td_borders = st.checkbox("Líneas internas en cuerpo (td)", value=show_td_borders_default)
-
-style = make_style(
-    primary=primary_color,
-    compact=compact_mode,
-    font_family=font_family,
-    tema_left=tema_left,
-    show_th_borders=show_th_borders,
-    show_td_borders=show_td_borders
-)
+# ====== Ejecución por fragmentos ======
+# Cada paso es un st.fragment: tocar uno de sus controles vuelve a ejecutar solo ese paso. Lo que un
+# paso entrega a los siguientes se publica en session_state y, solo si cambió, se vuelve a ejecutar
+# la app completa para que los pasos posteriores lo reciban (lectura y fechas quedan en caché).
+st.session_state["ejecucion_app"] = st.session_state.get("ejecucion_app", 0) + 1
+
+def hand_off(key, value):
+    """Publica el resultado de un paso; si cambió en una reejecución del fragmento, reejecuta la app."""
+    run = st.session_state["ejecucion_app"]
+    fragment_rerun = st.session_state.get(f"{key}__ejecucion") == run
+    changed = st.session_state.get(key) != value
+    st.session_state[key] = value
+    st.session_state[f"{key}__ejecucion"] = run
+    if fragment_rerun and changed:
+        st.rerun()
+
+def prepared_data(df_raw, map_cols):
+    """DataFrame mapeado, con fechas normalizadas y su DateIndex.
+
+    Se reutiliza mientras no cambien lectura ni mapeo.
+    """
+    cached = st.session_state.get("datos_preparados")
+    if cached is None or cached[0] is not df_raw or cached[1] != map_cols:
+        df = apply_column_mapping(df_raw, map_cols)
+        normalize_date_column(df, "Fecha de realización")
+        date_index = DateIndex(df["Fecha de realización"]) if "Fecha de realización" in df.columns else None
+        cached = (df_raw, dict(map_cols), df, date_index)
+        st.session_state["datos_preparados"] = cached
+    return cached[2], cached[3]
+
+def prepared_sheets(sheets, map_cols, enlace_conexion_global):
+    """{hoja: (DataFrame o None, faltantes)} de prepare_sheet().
+
+    Se reutiliza mientras no cambien lectura, mapeo ni enlace.
+    """
+    cached = st.session_state.get("hojas_preparadas")
+    if cached is None or cached[0] is not sheets or cached[1] != map_cols or cached[2] != enlace_conexion_global:
+        prepared = {name: prepare_sheet(sheet_df, map_cols, enlace_conexion_global)
+                    for name, sheet_df in sheets.items()}
+        cached = (sheets, dict(map_cols), enlace_conexion_global, prepared)
+        st.session_state["hojas_preparadas"] = cached
+    return cached[3]
 
 # =========================
 # Carga de archivo
 # =========================
-excel_file = st.file_uploader("Sube tu archivo Excel", type=["xlsx"], key="excel_xlsx_uploader_v3")
-
-if excel_file:
-    df_raw = pd.read_excel(excel_file)
-    colnames = list(df_raw.columns)
+excel_file = st.file_uploader("Sube tu archivo Excel (.xlsx / .ods), CSV o Parquet",
+                              type=[ext.lstrip(".") for ext in INPUT_FORMATS], key="excel_xlsx_uploader_v3")
+input_fmt = input_format(excel_file.name) if excel_file else "excel"
+excel_engine = st.selectbox("Motor de lectura", options=["auto"] + available_engines(input_fmt),
+                            key=f"read_engine_{input_fmt}",
+                            help="auto usa el lector más rápido instalado (calamine para Excel/ODS, pyarrow para "
+                                 "CSV/Parquet) y si no el estándar.")
+multi_sheet = input_fmt in ("excel", "ods") and st.checkbox(
+    "Modo varias hojas: una tabla por hoja del libro (todas se leen en una sola pasada)", key="multi_sheet")
 
+# =========================
+# Paso 1: Mapeo de columnas
+# =========================
+@st.fragment
+def paso_mapeo(colnames):
+    """Selectores de columna por campo lógico; devuelve (y publica en "map_cols") el mapeo elegido."""
     labels = [labelize(c) for c in colnames]
     label_to_orig = {labelize(c): c for c in colnames}
 
-    # =========================
-    # Paso 1: Mapeo de columnas
-    # =========================
     st.markdown("### Paso 1: Mapea las columnas de tu Excel a los campos lógicos")
     st.caption("Si tu Excel tiene encabezados distintos, asígnalos aquí. Si coinciden, quedarán preseleccionados.")
 
@@ -394,56 +280,119 @@ if excel_file:
         "Enlace de Conexión": label_to_orig.get(map_enlace_lbl) if map_enlace_lbl != "(ninguna)" else "(ninguna)",
         "Enlace de Grabación": label_to_orig.get(map_grab_lbl) if map_grab_lbl != "(ninguna)" else "(ninguna)",
     }
+    hand_off("map_cols", map_cols)
+    return map_cols
 
-    required_min = ["Unidad Didáctica", "Tema del encuentro", "Duración", "Fecha de realización"]
-    missing_map = [lf for lf in required_min if map_cols.get(lf) in (None, "(ninguna)")]
-    if missing_map:
-        st.error(f"Faltan asignaciones para: {', '.join(missing_map)}. Asigna esas columnas para continuar.")
-        st.stop()
-
-    rename_dict = {src: lf for lf, src in map_cols.items() if src and src != "(ninguna)"}
-    df = df_raw.rename(columns=rename_dict)
-    keep_cols = [c for c in LOGICAL_FIELDS if c in df.columns]
-    df = df[keep_cols].copy()
+# =========================
+# Paso 2: Filtro por fecha y enlace global
+# =========================
+@st.fragment
+def paso_filtro(df, date_index):
+    """Rango de fechas, días, enlace global y vista previa paginada; devuelve las filas filtradas.
 
-    # =========================
-    # Paso 2: Filtro por fecha y enlace global
-    # =========================
+    Cambiar de página en la vista previa solo reejecuta este paso; el resto de los controles publica
+    su selección en "filtro" para que la salida se regenere.
+    """
     st.markdown("### Paso 2: Filtra por fecha y (opcional) sobreescribe enlace de conexión")
-    fecha_col = "Fecha de realización"
-    if fecha_col not in df.columns:
-        st.error("No se encontró la columna lógica 'Fecha de realización' luego del mapeo.")
-        st.stop()
-
-    try:
-        df[fecha_col] = pd.to_datetime(df[fecha_col]).dt.date
-    except Exception:
-        pass
-
-    fechas_disponibles = df[fecha_col].dropna().unique().tolist()
-    fechas_disponibles = sorted(fechas_disponibles, key=lambda x: str(x))
-    fechas_seleccionadas = st.multiselect(
-        "Selecciona las fechas de realización para mostrar en la tabla:",
-        options=fechas_disponibles,
-        default=fechas_disponibles
-    )
-    df_filtrado = df[df[fecha_col].isin(fechas_seleccionadas)].copy()
+    if df.attrs.get("date_failures"):
+        st.warning(f"{df.attrs['date_failures']:,} fechas no se pudieron interpretar y se muestran tal cual "
+                   f"(p. ej.: {', '.join(df.attrs['date_failure_examples'])}).")
+
+    # Índice ordenado de fechas: el rango se resuelve con búsqueda binaria, en orden cronológico
+    n_sin_fecha = len(date_index.unparsed)
+    bounds = date_index.bounds()
+    if bounds is None:
+        st.warning("No se encontraron fechas válidas; se muestran todas las filas con algún valor en la fecha.")
+        seleccion = (None, None, [], True)
+    else:
+        fmin, fmax = bounds
+        rango = st.date_input("Rango de fechas de realización a mostrar (desde / hasta):", value=(fmin, fmax),
+                              min_value=fmin, max_value=fmax, format="DD/MM/YYYY", key=f"rango_fechas_{fmin}_{fmax}")
+        desde, hasta = (tuple(rango) + (fmax,))[:2] if rango else (fmin, fmax)
+        dias = st.multiselect("Días de la semana (vacío = todos):", options=list(range(7)),
+                              format_func=lambda d: WEEKDAYS_ES[d].capitalize(), key="dias_semana")
+        incluir_sin_fecha = n_sin_fecha > 0 and st.checkbox(
+            f"Incluir las {n_sin_fecha:,} filas cuya fecha no se pudo interpretar",
+            value=True, key="incluir_sin_fecha")
+        seleccion = (desde, hasta, dias, incluir_sin_fecha)
+    positions = date_index.select(*seleccion)
+    if bounds is not None:
+        st.caption(f"{len(positions):,} de {len(df):,} filas seleccionadas.")
+    df_filtrado = df.iloc[positions].copy()
 
     enlace_conexion_global = st.text_input("Enlace de conexión global (opcional; sobrescribe la columna):", value="")
-    if enlace_conexion_global.strip():
-        df_filtrado["Enlace de Conexión"] = enlace_conexion_global.strip()
-    else:
-        if "Enlace de Conexión" not in df_filtrado.columns:
-            df_filtrado["Enlace de Conexión"] = ""
-    if "Enlace de Grabación" not in df_filtrado.columns:
-        df_filtrado["Enlace de Grabación"] = ""
+    complete_link_columns(df_filtrado, enlace_conexion_global)
 
     st.write("Vista previa de la tabla filtrada:")
-    st.dataframe(df_filtrado, use_container_width=True)
+    st.number_input("Filas por página en las vistas previas (las descargas y copias incluyen todas):",
+                    min_value=10, max_value=10_000, value=PREVIEW_ROWS_DEFAULT, step=50, key="preview_rows")
+    st.dataframe(paged_preview(df_filtrado, "preview_page_tabla"), use_container_width=True)
 
-    # =========================
-    # Paso 3: Encabezados visibles
-    # =========================
+    hand_off("filtro", (seleccion, enlace_conexion_global, st.session_state.get("preview_rows")))
+    return df_filtrado, enlace_conexion_global
+
+# =========================
+# Apariencia: color, fuente, compacto, alineación y bordes
+# =========================
+def panel_apariencia():
+    """Controles de apariencia; devuelve (style, opciones) para renderizar y guardar la plantilla."""
+    st.markdown("### Apariencia")
+    default_primary = st.session_state.get("tpl_primary_color", "#ba372a")
+    primary_color = st.color_picker("Color institucional (encabezados, bordes y enlaces)", value=default_primary)
+
+    font_options = {
+        "Arial (segura)": "Arial, Helvetica, sans-serif",
+        "Roboto (moderna)": "Roboto, Arial, sans-serif",
+        "Georgia (serif)": "Georgia, serif",
+        "Times New Roman (serif)": "'Times New Roman', Times, serif",
+    }
+    tpl_font = st.session_state.get("tpl_font_family", "Arial, Helvetica, sans-serif")
+    default_font_label = next((k for k, v in font_options.items() if v == tpl_font), "Arial (segura)")
+    font_label = st.selectbox("Tipografía", options=list(font_options.keys()),
+                              index=list(font_options.keys()).index(default_font_label))
+    font_family = font_options[font_label]
+
+    default_compact = bool(st.session_state.get("tpl_compact_mode", False))
+    compact_mode = st.checkbox("Modo compacto (tipografía y celdas más pequeñas)", value=default_compact)
+
+    tema_left_default = bool(st.session_state.get("tpl_tema_left", False))
+    tema_left = st.checkbox("Alinear a la izquierda solo la columna “Tema del encuentro”",
+                            value=tema_left_default)
+
+    protect_table_default = bool(st.session_state.get("tpl_protect_table", True))
+    proteger_tabla = st.checkbox("Proteger tabla (sanear HTML conflictivo del bloque superior)",
+                                 value=protect_table_default)
+
+    # toggles bordes separados
+    show_th_borders_default = bool(st.session_state.get("tpl_show_th_borders", True))
+    show_td_borders_default = bool(st.session_state.get("tpl_show_td_borders", True))
+    col_b1, col_b2 = st.columns(2)
+    with col_b1:
+        show_th_borders = st.checkbox("Líneas internas en cabecera (th)", value=show_th_borders_default)
+    with col_b2:
+        show_td_borders = st.checkbox("Líneas internas en cuerpo (td)", value=show_td_borders_default)
+
+    compact_html_default = bool(st.session_state.get("tpl_compact_html", False))
+    compact_html = st.checkbox("HTML compacto (mismo aspecto, estilos mínimos y archivo más liviano)",
+                               value=compact_html_default)
+
+    style = make_style(
+        primary=primary_color,
+        compact=compact_mode,
+        font_family=font_family,
+        tema_left=tema_left,
+        show_th_borders=show_th_borders,
+        show_td_borders=show_td_borders
+    )
+    return style, dict(primary=primary_color, compact=compact_mode, font_family=font_family, tema_left=tema_left,
+                       proteger_tabla=proteger_tabla, show_th_borders=show_th_borders,
+                       show_td_borders=show_td_borders, compact_html=compact_html)
+
+# =========================
+# Paso 3: Encabezados visibles
+# =========================
+def panel_encabezados():
+    """Título y encabezados visibles; devuelve (titulo, {campo lógico: encabezado})."""
     st.markdown("### Paso 3: Personaliza los encabezados visibles (opcional)")
     default_title = st.session_state.get("tpl_titulo_principal", "Programación de encuentros sincrónicos")
     titulo_principal = st.text_input("Título principal encima de la tabla", value=default_title, key="titulo_principal")
@@ -451,13 +400,18 @@ if excel_file:
     tpl_hdrs = st.session_state.get("tpl_header_labels", DEFAULT_HEADERS_LABELS)
     col1, col2 = st.columns(2)
     with col1:
-        h_ud = st.text_input("Encabezado: Unidad Didáctica", value=tpl_hdrs.get("Unidad Didáctica", "Unidad Didáctica"))
-        h_tema = st.text_input("Encabezado: Tema del encuentro", value=tpl_hdrs.get("Tema del encuentro", "Tema del encuentro"))
-        h_dur = st.text_input("Encabezado: Duración", value=tpl_hdrs.get("Duración", "Duración"))
+        h_ud = st.text_input("Encabezado: Unidad Didáctica",
+                             value=tpl_hdrs.get("Unidad Didáctica", "Unidad Didáctica"), key="hdr_ud")
+        h_tema = st.text_input("Encabezado: Tema del encuentro",
+                               value=tpl_hdrs.get("Tema del encuentro", "Tema del encuentro"), key="hdr_tema")
+        h_dur = st.text_input("Encabezado: Duración", value=tpl_hdrs.get("Duración", "Duración"), key="hdr_dur")
     with col2:
-        h_fecha = st.text_input("Encabezado: Fecha de realización", value=tpl_hdrs.get("Fecha de realización", "Fecha de realización"))
-        h_enlace = st.text_input("Encabezado: Enlace de Conexión", value=tpl_hdrs.get("Enlace de Conexión", "Enlace de Conexión"))
-        h_grab = st.text_input("Encabezado: Enlace de Grabación", value=tpl_hdrs.get("Enlace de Grabación", "Enlace de Grabación"))
+        h_fecha = st.text_input("Encabezado: Fecha de realización",
+                                value=tpl_hdrs.get("Fecha de realización", "Fecha de realización"), key="hdr_fecha")
+        h_enlace = st.text_input("Encabezado: Enlace de Conexión",
+                                 value=tpl_hdrs.get("Enlace de Conexión", "Enlace de Conexión"), key="hdr_enlace")
+        h_grab = st.text_input("Encabezado: Enlace de Grabación",
+                               value=tpl_hdrs.get("Enlace de Grabación", "Enlace de Grabación"), key="hdr_grab")
 
     header_labels_by_logical = {
         "Unidad Didáctica": h_ud,
@@ -467,10 +421,13 @@ if excel_file:
         "Enlace de Conexión": h_enlace,
         "Enlace de Grabación": h_grab,
     }
+    return titulo_principal, header_labels_by_logical
 
-    # =========================
-    # Paso 4: Orden y visibilidad
-    # =========================
+# =========================
+# Paso 4: Orden y visibilidad
+# =========================
+def panel_orden():
+    """Orden de columnas y columnas ocultas; devuelve (orden, conjunto de ocultas)."""
     st.markdown("### Paso 4: Orden de columnas y visibilidad")
     st.caption("Elige el orden 1→6 y qué columnas ocultar. El ocultamiento no modifica tu Excel, solo la salida HTML.")
 
@@ -502,14 +459,18 @@ if excel_file:
     hidden_cols = set()
     c1, c2, c3 = st.columns(3)
     with c1:
-        hide_ud = st.checkbox("Ocultar: Unidad Didáctica", value=("Unidad Didáctica" in tpl_hidden))
-        hide_tema = st.checkbox("Ocultar: Tema del encuentro", value=("Tema del encuentro" in tpl_hidden))
+        hide_ud = st.checkbox("Ocultar: Unidad Didáctica", value=("Unidad Didáctica" in tpl_hidden), key="hide_ud")
+        hide_tema = st.checkbox("Ocultar: Tema del encuentro",
+                                value=("Tema del encuentro" in tpl_hidden), key="hide_tema")
     with c2:
-        hide_dur = st.checkbox("Ocultar: Duración", value=("Duración" in tpl_hidden))
-        hide_fecha = st.checkbox("Ocultar: Fecha de realización", value=("Fecha de realización" in tpl_hidden))
+        hide_dur = st.checkbox("Ocultar: Duración", value=("Duración" in tpl_hidden), key="hide_dur")
+        hide_fecha = st.checkbox("Ocultar: Fecha de realización",
+                                 value=("Fecha de realización" in tpl_hidden), key="hide_fecha")
     with c3:
-        hide_enlace = st.checkbox("Ocultar: Enlace de Conexión", value=("Enlace de Conexión" in tpl_hidden))
-        hide_grab = st.checkbox("Ocultar: Enlace de Grabación", value=("Enlace de Grabación" in tpl_hidden))
+        hide_enlace = st.checkbox("Ocultar: Enlace de Conexión",
+                                  value=("Enlace de Conexión" in tpl_hidden), key="hide_enlace")
+        hide_grab = st.checkbox("Ocultar: Enlace de Grabación",
+                                value=("Enlace de Grabación" in tpl_hidden), key="hide_grab")
 
     if hide_ud: hidden_cols.add("Unidad Didáctica")
     if hide_tema: hidden_cols.add("Tema del encuentro")
@@ -517,52 +478,70 @@ if excel_file:
     if hide_fecha: hidden_cols.add("Fecha de realización")
     if hide_enlace: hidden_cols.add("Enlace de Conexión")
     if hide_grab: hidden_cols.add("Enlace de Grabación")
+    return display_order, hidden_cols
 
-    # =========================
-    # Paso 5: Editor de texto con barra (opcional)
-    # =========================
+# =========================
+# Paso 5: Editor de texto con barra (opcional)
+# =========================
+EDITOR_SNIPPETS = [
+    ("H1", "<h1 style='font-family: Arial, Helvetica, sans-serif;'>Título H1</h1>\n"),
+    ("H2", "<h2 style='font-family: Arial, Helvetica, sans-serif;'>Título H2</h2>\n"),
+    ("H3", "<h3 style='font-family: Arial, Helvetica, sans-serif;'>Título H3</h3>\n"),
+    ("Negrita", "<strong>texto en negrita</strong> "),
+    ("Cursiva", "<em>texto en cursiva</em> "),
+    ("Lista", "<ul><li>Elemento 1</li><li>Elemento 2</li></ul>\n"),
+    ("Párrafo", "<p style='font-family: Arial, Helvetica, sans-serif; font-size: 12pt; color:#404e5c;'>"
+                "Tu párrafo aquí.</p>\n"),
+    ("Enlace", "<a href='https://ejemplo.com' target='_blank'>Un enlace</a> "),
+    ("Separador", "<hr/>\n"),
+]
+EDITOR_COMPONENT_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "componentes", "editor_html")
+# se declara una sola vez; panel_editor() solo llama a la función que devuelve
+editor_html = components.declare_component("editor_html", path=EDITOR_COMPONENT_DIR)
+
+def panel_editor():
+    """Editor del bloque superior con barra de fragmentos (queda en session_state["texto_html"]).
+
+    La barra inserta en el navegador, en la posición del cursor; el texto vuelve a Python una sola
+    vez al salir del editor o tras una pausa al escribir, así que los clics no reejecutan la app.
+    """
     st.markdown("### Paso 5: Texto (opcional) para insertar arriba de la tabla")
     st.caption("Este texto se insertará en el HTML final. Puedes escribir texto plano o HTML simple.")
-    with st.expander("Barra de herramientas de texto (opcional)"):
-        tcol1, tcol2, tcol3, tcol4, tcol5, tcol6 = st.columns(6)
-        with tcol1:
-            if st.button("H1"):
-                _append_snippet("<h1 style='font-family: Arial, Helvetica, sans-serif;'>Título H1</h1>\n")
-        with tcol2:
-            if st.button("H2"):
-                _append_snippet("<h2 style='font-family: Arial, Helvetica, sans-serif;'>Título H2</h2>\n")
-        with tcol3:
-            if st.button("H3"):
-                _append_snippet("<h3 style='font-family: Arial, Helvetica, sans-serif;'>Título H3</h3>\n")
-        with tcol4:
-            if st.button("Negrita"):
-                _append_snippet("<strong>texto en negrita</strong> ")
-        with tcol5:
-            if st.button("Cursiva"):
-                _append_snippet("<em>texto en cursiva</em> ")
-        with tcol6:
-            if st.button("Lista"):
-                _append_snippet("<ul><li>Elemento 1</li><li>Elemento 2</li></ul>\n")
-
-        tcol7, tcol8, tcol9 = st.columns(3)
-        with tcol7:
-            if st.button("Párrafo"):
-                _append_snippet("<p style='font-family: Arial, Helvetica, sans-serif; font-size: 12pt; color:#404e5c;'>Tu párrafo aquí.</p>\n")
-        with tcol8:
-            if st.button("Enlace"):
-                _append_snippet("<a href='https://ejemplo.com' target='_blank'>Un enlace</a> ")
-        with tcol9:
-            if st.button("Separador"):
-                _append_snippet("<hr/>\n")
-
-    st.text_area("Editor (puedes escribir o pegar HTML; la barra de herramientas inserta fragmentos):",
-                 key="texto_html", height=180)
+    texto = st.session_state.get("texto_html", "")
+    version = st.session_state.get("texto_html_version", 0)
+    valor = editor_html(text=texto, version=version, snippets=EDITOR_SNIPPETS, height=180, debounce_ms=800,
+                        label="Editor (puedes escribir o pegar HTML; la barra de herramientas inserta "
+                              "fragmentos en el cursor):",
+                        key="editor_html", default=None)
+    # un valor de una versión anterior (enviado antes de cargar una plantilla) se descarta
+    if valor and valor.get("version") == version and valor.get("text") != texto:
+        st.session_state["texto_html"] = valor["text"]
 
-    # =========================
-    # Generación del HTML
-    # =========================
-    headers_by_logical = header_labels_by_logical
-    full_html, table_only_html = generar_tabla_html(
+# =========================
+# Salida: generación del HTML, copiado, vista previa y descargas
+# =========================
+@st.fragment
+def paso_salida(df_filtrado, map_cols, enlace_conexion_global, sheets=None, hoja_activa=None):
+    """Apariencia, encabezados, orden, editor y todo lo que depende de ellos.
+
+    Van en un solo fragmento porque un control solo reejecuta su propio fragmento: así un cambio
+    de estilo o de encabezados regenera la salida sin volver a pasar por lectura, mapeo ni fechas.
+    """
+    style, apariencia = panel_apariencia()
+
+    # Modo formulario: los cambios de encabezados, orden y visibilidad se acumulan y se aplican juntos
+    # (una sola regeneración por tanda de cambios en lugar de una por control)
+    modo_formulario = st.checkbox("Aplicar encabezados, orden y visibilidad con un botón "
+                                  "(útil al editar varios a la vez)", key="modo_formulario")
+    with st.form("form_encabezados_orden", border=False) if modo_formulario else nullcontext():
+        titulo_principal, headers_by_logical = panel_encabezados()
+        display_order, hidden_cols = panel_orden()
+        if modo_formulario:
+            st.form_submit_button("Aplicar cambios", type="primary")
+    panel_editor()
+    compact_html = apariencia["compact_html"]
+
+    render_kwargs = dict(
         df_disp=df_filtrado,
         titulo=titulo_principal,
         headers_by_logical=headers_by_logical,
@@ -570,16 +549,30 @@ if excel_file:
         hidden_set=hidden_cols,
         texto_extra=st.session_state.get("texto_html", ""),
         style=style,
-        proteger_tabla=proteger_tabla
+        proteger_tabla=apariencia["proteger_tabla"],
+        cache=get_output_cache(),
     )
+    full_html, table_only_html, table_only_page = render_outputs(
+        compact_html=compact_html, renderer=get_renderer(), **render_kwargs)
+    if compact_html:
+        _, normal_table_html, _ = render_outputs(compact_html=False, renderer=None, **render_kwargs)
+        size = html_size_report(normal_table_html, table_only_html)
+        st.caption(f"HTML compacto: la tabla pesa {size['bytes_after']:,} bytes en lugar de "
+                   f"{size['bytes_before']:,} ({size['saved_pct']}% menos).")
 
     st.markdown("### Copia este HTML para Canvas (COMPLETO):")
-    st.code(full_html, language="html")
+    code_viewer(full_html, len(df_filtrado), "ver_codigo_completo")
 
     st.markdown("### Copia solo la TABLA (sin bloque superior ni título):")
-    st.code(table_only_html, language="html")
+    code_viewer(table_only_html, len(df_filtrado), "ver_codigo_tabla")
 
     # ====== Botones de copiado ======
+    # Una sola carga comprimida (la tabla viaja una vez); se reutiliza mientras la salida no cambie.
+    cached = st.session_state.get("copia_portapapeles")
+    if cached is None or cached[0] != full_html or cached[1] != table_only_html:
+        cached = (full_html, table_only_html, clipboard_payload(full_html, table_only_html))
+        st.session_state["copia_portapapeles"] = cached
+    payload, table_start, full_end = cached[2]
     components.html(
         f"""
         <div style="margin: 8px 0 6px 0;">
@@ -591,32 +584,57 @@ if excel_file:
             </button>
             <span id="copyStatus" style="margin-left:8px; color:#555;"></span>
         </div>
-        <textarea id="htmlFull" style="position:absolute; left:-10000px; top:-10000px;">{html_escape(full_html)}</textarea>
-        <textarea id="htmlTable" style="position:absolute; left:-12000px; top:-12000px;">{html_escape(table_only_html)}</textarea>
+        <script id="payload" type="application/octet-stream">{payload}</script>
         <script>
         const status = document.getElementById('copyStatus');
-        async function copyFrom(id) {{
-            const area = document.getElementById(id);
+        // gzip(UTF-8) en base64: el completo son los bytes [0, {full_end}) y la tabla desde {table_start};
+        // se descomprime una sola vez al cargar
+        const ready = (async () => {{
+            const b64 = document.getElementById('payload').textContent.trim();
+            const packed = Uint8Array.from(atob(b64), c => c.charCodeAt(0));
+            const stream = new Blob([packed]).stream().pipeThrough(new DecompressionStream('gzip'));
+            const bytes = new Uint8Array(await new Response(stream).arrayBuffer());
+            const utf8 = new TextDecoder('utf-8');
+            return {{
+                full: utf8.decode(bytes.subarray(0, {full_end})),
+                table: utf8.decode(bytes.subarray({table_start})),
+            }};
+        }})();
+        function done(msg) {{
+            status.textContent = msg;
+            setTimeout(()=>{{status.textContent='';}}, 2000);
+        }}
+        async function copyFrom(which) {{
+            const text = (await ready)[which];
             try {{
-                await navigator.clipboard.writeText(area.value);
-                status.textContent = '✔ Copiado';
-                setTimeout(()=>{{status.textContent='';}}, 2000);
+                await navigator.clipboard.writeText(text);
+                done('✔ Copiado');
             }} catch(e) {{
+                const area = document.createElement('textarea');
+                area.value = text;
+                area.style.cssText = 'position:absolute; left:-10000px; top:-10000px;';
+                document.body.appendChild(area);
                 area.select();
                 document.execCommand('copy');
-                status.textContent = '✔ Copiado (fallback)';
-                setTimeout(()=>{{status.textContent='';}}, 2000);
+                area.remove();
+                done('✔ Copiado (fallback)');
             }}
         }}
-        document.getElementById('copyFull').addEventListener('click', () => copyFrom('htmlFull'));
-        document.getElementById('copyTable').addEventListener('click', () => copyFrom('htmlTable'));
+        document.getElementById('copyFull').addEventListener('click', () => copyFrom('full'));
+        document.getElementById('copyTable').addEventListener('click', () => copyFrom('table'));
         </script>
         """,
         height=70,
     )
 
     st.markdown("### Vista previa (¡así se vería en Canvas!):", unsafe_allow_html=True)
-    st.markdown(full_html, unsafe_allow_html=True)
+    df_preview = paged_preview(df_filtrado, "preview_page_canvas")
+    if len(df_preview) == len(df_filtrado):
+        preview_html = full_html
+    else:
+        preview_html = render_outputs(**{**render_kwargs, "df_disp": df_preview, "cache": None},
+                                      compact_html=compact_html, renderer=get_renderer())[0]
+    st.markdown(preview_html, unsafe_allow_html=True)
 
     # =========================
     # Guardar / Descargar
@@ -629,13 +647,7 @@ if excel_file:
         hidden_columns=hidden_cols,
         titulo_principal=titulo_principal,
         texto_html=st.session_state.get("texto_html", ""),
-        primary=primary_color,
-        compact=compact_mode,
-        font_family=font_family,
-        tema_left=tema_left,
-        proteger_tabla=proteger_tabla,
-        show_th_borders=show_th_borders,
-        show_td_borders=show_td_borders
+        **apariencia
     )
     st.download_button(
         "⬇️ Descargar plantilla (.json)",
@@ -644,9 +656,6 @@ if excel_file:
         mime="application/json"
     )
 
-    # HTML mínimo que envuelve solo la tabla (para abrir directo en navegador)
-    table_only_page = f"<!doctype html><html><head><meta charset='utf-8'><title>Tabla Canvas</title></head><body>{table_only_html}</body></html>"
-
     # Descargas
     col_dl1, col_dl2, col_dl3 = st.columns(3)
     with col_dl1:
@@ -671,5 +680,77 @@ if excel_file:
             mime="text/html"
         )
 
+    # =========================
+    # Modo varias hojas: una tabla por hoja y descarga combinada
+    # =========================
+    if sheets is not None:
+        st.markdown("### Todas las hojas del libro")
+        st.caption(f"Misma configuración en todas las hojas; el filtro de fechas solo aplica a «{hoja_activa}», "
+                   "las demás incluyen todas sus fechas.")
+        frames = {}
+        for name, (df_sheet, missing) in prepared_sheets(sheets, map_cols, enlace_conexion_global).items():
+            if name == hoja_activa:
+                frames[name] = df_filtrado
+            elif df_sheet is None:
+                st.warning(f"Hoja «{name}» omitida: faltan asignaciones para {', '.join(missing)}.")
+            else:
+                frames[name] = df_sheet
+        sheet_kwargs = {k: v for k, v in render_kwargs.items() if k != "df_disp"}
+        sheet_kwargs["cache"] = get_sheet_output_cache()
+        outputs_by_sheet = render_sheets(frames, compact_html=compact_html, **sheet_kwargs)
+        st.caption(" · ".join(f"{name}: {len(df):,} filas" for name, df in frames.items()))
+        # el .zip se rearma solo si alguna salida cambió (se comparan valores: la OutputCache rearma las strings)
+        cached = st.session_state.get("zip_hojas")
+        if cached is None or cached[0] != outputs_by_sheet:
+            cached = (outputs_by_sheet, zip_outputs(outputs_by_sheet))
+            st.session_state["zip_hojas"] = cached
+        st.download_button(
+            "⬇️ Descargar todas las hojas (.zip)",
+            data=cached[1],
+            file_name="tablas_canvas_por_hoja.zip",
+            mime="application/zip"
+        )
+        cache_stats_caption("Caché de salidas por hoja", get_sheet_output_cache())
+
+    cache_stats_caption("Caché de salidas HTML", get_output_cache())
+
+if excel_file:
+    try:
+        if multi_sheet:
+            sheets = read_workbook_sheets(excel_file, engine=excel_engine)
+            hoja_activa = st.selectbox("Hoja a configurar y previsualizar (las demás usan la misma configuración):",
+                                       options=list(sheets), key="hoja_activa")
+            colnames = list(sheets[hoja_activa].columns)
+        else:
+            sheets, hoja_activa = None, None
+            colnames = read_workbook_header(excel_file, engine=excel_engine)
+    except (ImportError, ValueError) as e:
+        st.error(f"No se pudo leer el archivo: {e}")
+        st.stop()
+
+    map_cols = paso_mapeo(colnames)
+    missing_map = missing_required(map_cols)
+    if missing_map:
+        st.error(f"Faltan asignaciones para: {', '.join(missing_map)}. Asigna esas columnas para continuar.")
+        st.stop()
+
+    try:
+        if multi_sheet:
+            df_raw = sheets[hoja_activa]
+        else:
+            df_raw = read_workbook(excel_file, colnames, map_cols, engine=excel_engine)
+    except (ImportError, ValueError) as e:
+        st.error(f"No se pudo leer el archivo: {e}")
+        st.stop()
+    st.caption(f"Archivo leído con {df_raw.attrs.get('read_engine', '?')} "
+               f"en {df_raw.attrs.get('read_seconds', 0.0):.2f} s.")
+    df, date_index = prepared_data(df_raw, map_cols)
+    if date_index is None:
+        st.error("No se encontró la columna lógica 'Fecha de realización' luego del mapeo.")
+        st.stop()
+
+    df_filtrado, enlace_conexion_global = paso_filtro(df, date_index)
+    paso_salida(df_filtrado, map_cols, enlace_conexion_global, sheets, hoja_activa)
+
 else:
-    st.info("Sube un archivo Excel para comenzar.")
\ No newline at end of file
+    st.info("Sube un archivo Excel para comenzar.")
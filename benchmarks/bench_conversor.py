@@ -0,0 +1,421 @@
+"""Benchmarks de lectura, saneado y renderizado con libros sintéticos.
+
+Uso:
+    python benchmarks/bench_conversor.py                      # 10, 1.000 y 100.000 filas
+    python benchmarks/bench_conversor.py --sizes 10 1000000   # hasta 1M filas (el .xlsx tarda en generarse)
+    python benchmarks/bench_conversor.py --compare resultados_anteriores.json
+
+Cada etapa se mide por separado (mejor de --repeat corridas) y, en una corrida extra con
+tracemalloc, su pico de memoria. Los resultados se guardan en JSON para comparar entre commits.
+Los .xlsx generados se reutilizan desde --workdir. El saneador del bloque de usuario se mide
+además con entradas adversarias de 1 MB (aperturas sin cierre, "<" sueltos) para verificar
+que su tiempo crece linealmente.
+
+También se mide el arranque en frío: cada importación corre en un proceso nuevo con
+`python -X importtime` y se informa su tiempo acumulado, los módulos de primer nivel más pesados
+y qué módulos pesados (pandas, numpy, openpyxl...) quedaron cargados. "app (primer pintado)"
+importa lo mismo que app_conversortabla.py antes de que se suba un archivo.
+
+La lectura se mide con cada motor instalado (calamine/openpyxl para .xlsx; pyarrow/C para el
+mismo libro exportado a CSV; Parquet) y se verifica que los motores de un mismo formato
+produzcan DataFrames idénticos (además de tests/test_readers.py, con libros chicos en .xlsx, .ods
+y .csv); si alguno difiere el script termina con código 1. Lo mismo si el
+IncrementalRenderer, tras una secuencia de cambios (ocultar, intercambiar columnas iguales,
+renombrar encabezados), produce algo distinto de iter_table_html().
+"""
+import argparse
+import datetime as dt
+import html
+import importlib.util
+import json
+import os
+import platform
+import subprocess
+import sys
+import time
+import tracemalloc
+
+import numpy as np
+import pandas as pd
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+from conversor_core import (  # noqa: E402
+    LOGICAL_FIELDS, DEFAULT_EXPECTED, DEFAULT_HEADERS_LABELS, available_engines, read_header, read_mapped_columns,
+    best_default, resolve_map_cols,
+    apply_column_mapping, normalize_date_column, DateIndex, parse_dates, complete_link_columns, sanitize_user_html,
+    build_user_block,
+    make_style, generar_tabla_html, clipboard_payload, iter_table_html, IncrementalRenderer,
+)
+
+DEFAULT_SIZES = [10, 1_000, 100_000]
+
+# =========================
+# Datos sintéticos
+# =========================
+def make_schedule(n_rows, seed=0):
+    """Programación sintética con las cabeceras "reales" del Excel institucional (espacios incluidos)."""
+    rng = np.random.default_rng(seed)
+    base = dt.datetime(2026, 2, 2, 18, 0)
+    offsets = rng.integers(0, 180, n_rows)
+    kind = rng.integers(0, 4, n_rows)
+    fechas = []
+    for off, k in zip(offsets.tolist(), kind.tolist()):
+        d = base + dt.timedelta(days=off)
+        if k == 0:
+            fechas.append(d)                                  # datetime real
+        elif k == 1:
+            fechas.append(d.strftime("%d/%m/%Y"))             # texto dd/mm/aaaa
+        elif k == 2:
+            fechas.append((d - dt.datetime(1899, 12, 30)).days)  # serial de Excel
+        else:
+            fechas.append(None)                               # celda vacía
+    temas = [
+        f"Encuentro {i % 40 + 1}: tema principal\nSubtema {i % 7 + 1} con <b>detalle</b>" if i % 3
+        else f"Tutoría {i % 40 + 1}"
+        for i in range(n_rows)
+    ]
+    enlaces = [f"https://zoom.us/j/{9000000 + i % 300}" if i % 5 else np.nan for i in range(n_rows)]
+    return pd.DataFrame({
+        DEFAULT_EXPECTED["Unidad Didáctica"]: [f"Unidad {i % 6 + 1}" for i in range(n_rows)],
+        DEFAULT_EXPECTED["Tema del encuentro"]: temas,
+        DEFAULT_EXPECTED["Duración"]: np.where(rng.random(n_rows) < 0.1, None, "2 horas"),
+        DEFAULT_EXPECTED["Fecha de realización"]: fechas,
+        DEFAULT_EXPECTED["Enlace de Conexión"]: enlaces,
+        DEFAULT_EXPECTED["Enlace de Grabación"]: np.nan,
+        "Observaciones": [f"obs {i}" if i % 11 == 0 else np.nan for i in range(n_rows)],
+    })
+
+def make_date_values(n_rows, seed=0):
+    """Fechas como las escriben a mano: en español, dd/mm/aaaa, seriales, datetimes y algún texto libre."""
+    rng = np.random.default_rng(seed)
+    meses = ["enero", "febrero", "marzo", "abril", "mayo", "junio",
+             "julio", "agosto", "septiembre", "octubre", "noviembre", "diciembre"]
+    base = dt.date(2026, 2, 2)
+    pool = []
+    for off in range(180):
+        d = base + dt.timedelta(days=off)
+        pool += [f"{d.day} de {meses[d.month - 1]} de {d.year}", d.strftime("%d/%m/%Y"),
+                 (d - dt.date(1899, 12, 30)).days, dt.datetime.combine(d, dt.time(18))]
+    pool += ["por definir", None]
+    return pd.Series([pool[i] for i in rng.integers(0, len(pool), n_rows)], dtype=object)
+
+def make_user_text(n_bytes):
+    """Anuncio pegado por el usuario: HTML permitido mezclado con tablas, estilos y scripts."""
+    chunk = ("<h2>Aviso</h2><p>Recuerden <strong>conectarse</strong> 5 minutos antes.</p>"
+             "<table><tr><td>x</td></tr></table><style>td{color:red}</style>"
+             "<script>alert(1)</script><ul><li>Uno</li><li>Dos</li></ul><br>\n")
+    return chunk * max(1, n_bytes // len(chunk))
+
+ADVERSARIAL_CHUNKS = {
+    "script_sin_cierre": "<script>x",          # cada apertura buscaba su cierre hasta el final
+    "etiqueta_sin_cierre": "<b x",             # "<b ..." sin ">" releía el resto del texto
+    "style_anidado": "<style><style>a</sty",
+    "menores_sueltos": "< <</ <<a",
+    "mixto": "<p>ok</p><div><script>alert(1)<b>",
+}
+
+def make_adversarial_html(kind, n_bytes):
+    """Texto patológico para el saneador: el mismo fragmento repetido hasta `n_bytes`."""
+    chunk = ADVERSARIAL_CHUNKS[kind]
+    return chunk * max(1, n_bytes // len(chunk))
+
+def workbook_path(workdir, n_rows, seed):
+    path = os.path.join(workdir, f"programacion_{n_rows}_{seed}.xlsx")
+    if not os.path.exists(path):
+        os.makedirs(workdir, exist_ok=True)
+        t0 = time.perf_counter()
+        make_schedule(n_rows, seed).to_excel(path, index=False)
+        print(f"  (generado {path} en {time.perf_counter() - t0:.1f}s)", file=sys.stderr)
+    return path
+
+def export_path(workdir, n_rows, seed, ext):
+    """El mismo libro sintético exportado a CSV o Parquet (columnas mixtas como texto en Parquet)."""
+    path = os.path.join(workdir, f"programacion_{n_rows}_{seed}{ext}")
+    if not os.path.exists(path):
+        df = pd.read_excel(workbook_path(workdir, n_rows, seed))
+        if ext == ".csv":
+            df.to_csv(path, index=False)
+        else:
+            df.astype({c: "string" for c in df.columns if df[c].dtype == object}).to_parquet(path, index=False)
+    return path
+
+# =========================
+# Etapas
+# =========================
+def read_input(path, fmt, engine):
+    """Encabezados y luego las columnas mapeadas, como en la app."""
+    colnames = list(read_header(path, engine=engine, fmt=fmt).columns)
+    return read_mapped_columns(path, colnames, resolve_map_cols(colnames), engine=engine, fmt=fmt)
+
+def prepare(df_raw):
+    map_cols = resolve_map_cols(list(df_raw.columns))
+    return complete_link_columns(apply_column_mapping(df_raw, map_cols))
+
+def date_filter(df):
+    """Lo mismo que hace el Paso 2 con el rango completo de fechas seleccionado."""
+    df = normalize_date_column(df.copy())
+    date_index = DateIndex(df["Fecha de realización"])
+    return df.iloc[date_index.select(*(date_index.bounds() or (None, None)), include_unparsed=True)]
+
+def best_default_all(colnames):
+    return {lf: best_default(colnames, DEFAULT_EXPECTED[lf]) for lf in LOGICAL_FIELDS}
+
+def render(df):
+    return generar_tabla_html(df, "Programación de encuentros sincrónicos", DEFAULT_HEADERS_LABELS,
+                              LOGICAL_FIELDS, set(), "", make_style(), True)
+
+RENDER_SCENARIOS = [   # (ocultas, orden, encabezados distintos); se aplican en secuencia sobre un mismo renderizador
+    (set(), LOGICAL_FIELDS, {}),
+    ({"Enlace de Grabación"}, LOGICAL_FIELDS, {}),
+    ({"Enlace de Conexión"}, LOGICAL_FIELDS, {}),
+    (set(), LOGICAL_FIELDS[:4] + ["Enlace de Grabación", "Enlace de Conexión"], {}),
+    (set(), LOGICAL_FIELDS, {"Duración": "Horas"}),
+    ({"Duración"}, LOGICAL_FIELDS[::-1], {}),
+]
+
+def check_incremental_renderer(df):
+    """(iguales, detalle): IncrementalRenderer frente a iter_table_html() en RENDER_SCENARIOS.
+
+    Se corre con los enlaces reales, con ambos vacíos (como un CSV sin columnas de enlace), para
+    que dos columnas visibles de contenido idéntico se intercambien, y con un techo de memoria
+    mínimo, para pasar por los descartes y por el render sin caché.
+    """
+    sin_enlaces = df.assign(**{"Enlace de Conexión": "", "Enlace de Grabación": ""})
+    style = make_style()
+    for name, frame, max_bytes in (("enlaces", df, None), ("enlaces vacíos", sin_enlaces, None),
+                                   ("techo de 64 KiB", df, 64 * 1024)):
+        renderer = IncrementalRenderer() if max_bytes is None else IncrementalRenderer(max_bytes=max_bytes)
+        for i, (hidden, order, labels) in enumerate(RENDER_SCENARIOS):
+            headers = {**DEFAULT_HEADERS_LABELS, **labels}
+            got = "".join(renderer.iter_table_html(frame, headers, order, hidden, style))
+            if got != "".join(iter_table_html(frame, headers, order, hidden, style)):
+                return False, f"{name}, escenario {i}"
+    return True, ""
+
+def compare_engines(frames):
+    """(iguales, detalle) comparando el DataFrame de cada motor contra el del primero."""
+    (base_engine, base), *others = frames.items()
+    for engine, df in others:
+        try:
+            pd.testing.assert_frame_equal(base, df)
+        except AssertionError as e:
+            return False, f"{base_engine} vs {engine}: {str(e).splitlines()[0]}"
+    return True, ""
+
+def measure(fn, repeat, with_memory):
+    """(mejor tiempo en s, pico de memoria en bytes o None, resultado)."""
+    best, result = float("inf"), None
+    for _ in range(repeat):
+        t0 = time.perf_counter()
+        result = fn()
+        best = min(best, time.perf_counter() - t0)
+    peak = None
+    if with_memory:
+        tracemalloc.start()
+        fn()
+        peak = tracemalloc.get_traced_memory()[1]
+        tracemalloc.stop()
+    return best, peak, result
+
+def bench_size(n_rows, args, engine_checks, checks):
+    path = workbook_path(args.workdir, n_rows, args.seed)
+    repeat = 1 if n_rows >= 100_000 else args.repeat
+    user_text = make_user_text(min(n_rows * 100, 2 * 1024 * 1024))
+    rows = []
+
+    def record(stage, fn, units, unit_name):
+        secs, peak, result = measure(fn, repeat, args.memory)
+        rows.append({
+            "stage": stage,
+            "rows": n_rows,
+            "seconds": round(secs, 6),
+            "throughput": round(units / secs, 1) if secs else None,
+            "throughput_unit": unit_name,
+            "peak_mb": round(peak / 2**20, 3) if peak is not None else None,
+        })
+        print(f"  {stage:<20} {n_rows:>9} filas  {secs * 1000:10.2f} ms"
+              + (f"  pico {peak / 2**20:8.1f} MB" if peak is not None else ""))
+        return result
+
+    df_raw = None
+    for fmt, fmt_path in (("excel", path), ("csv", export_path(args.workdir, n_rows, args.seed, ".csv")),
+                          ("parquet", export_path(args.workdir, n_rows, args.seed, ".parquet"))):
+        engines = [e for e in available_engines(fmt) if fmt != "excel" or e in args.engines]
+        frames = {}
+        for engine in engines:
+            frames[engine] = record(f"read_{fmt}[{engine}]", lambda e=engine: read_input(fmt_path, fmt, e),
+                                    n_rows, "rows/s")
+        if len(frames) > 1:
+            equal, detail = compare_engines(frames)
+            engine_checks.append({"format": fmt, "rows": n_rows, "engines": list(frames), "equal": equal,
+                                  "detail": detail})
+            print(f"  motores {fmt} {'idénticos' if equal else 'DISTINTOS: ' + detail}")
+        if df_raw is None and frames:
+            df_raw = next(iter(frames.values()))
+    record("best_default", lambda: best_default_all(list(df_raw.columns)), len(LOGICAL_FIELDS), "fields/s")
+    record("sanitize_user_html", lambda: sanitize_user_html(user_text), len(user_text), "bytes/s")
+    style = make_style()
+    # memoizado: con la caché ya cargada, cada rerun solo calcula el sha256 del texto
+    build_user_block(user_text, style, True)
+    record("build_user_block", lambda: build_user_block(user_text, style, True), len(user_text), "bytes/s")
+    fechas = make_date_values(n_rows, args.seed)
+    record("parse_dates", lambda: parse_dates(fechas), n_rows, "rows/s")
+    df = prepare(df_raw)
+    df_filtrado = record("date_filter", lambda: date_filter(df), n_rows, "rows/s")
+    full_html, table_html = record("generar_tabla_html", lambda: render(df_filtrado), len(df_filtrado), "rows/s")
+    payload = record("clipboard_payload", lambda: clipboard_payload(full_html, table_html),
+                     len(full_html) + len(table_html), "chars/s")
+    equal, detail = check_incremental_renderer(df_filtrado.head(2_000))
+    checks.append({"check": "incremental_renderer", "rows": n_rows, "equal": equal, "detail": detail})
+    print(f"  renderizador incremental {'igual a iter_table_html' if equal else 'DISTINTO: ' + detail}")
+    escaped = len(html.escape(full_html).encode("utf-8")) + len(html.escape(table_html).encode("utf-8"))
+    print(f"  {'':<20} {'':>9}        copiado: {len(payload[0]):,} bytes en lugar de {escaped:,} "
+          f"(dos textareas escapados)")
+    return rows
+
+def bench_adversarial(args):
+    """Saneador con entradas patológicas de 1/4 y del total de --adversarial-bytes: el tiempo debe crecer ~x4."""
+    rows = []
+    for kind in ADVERSARIAL_CHUNKS:
+        times = []
+        for n_bytes in (args.adversarial_bytes // 4, args.adversarial_bytes):
+            text = make_adversarial_html(kind, n_bytes)
+            secs, _, _ = measure(lambda: sanitize_user_html(text), args.repeat, False)
+            times.append(secs)
+            rows.append({
+                "stage": f"sanitize_adversarial[{kind}]",
+                "rows": len(text),
+                "seconds": round(secs, 6),
+                "throughput": round(len(text) / secs, 1) if secs else None,
+                "throughput_unit": "bytes/s",
+                "peak_mb": None,
+            })
+        print(f"  {kind:<22} {len(text) / 2**20:6.2f} MB {times[-1] * 1000:10.2f} ms"
+              f"  (x{times[-1] / times[0]:.1f} respecto de 1/4 del tamaño)")
+    return rows
+
+# =========================
+# Tiempo de importación (arranque en frío)
+# =========================
+IMPORT_TARGETS = {
+    "conversor_core": "import conversor_core",
+    "app (primer pintado)": "import streamlit, json, io, hashlib, html, conversor_core",
+    "streamlit": "import streamlit",
+    "pandas": "import pandas",
+    "openpyxl": "import openpyxl",
+    "python_calamine": "import python_calamine",
+}
+HEAVY_MODULES = ("pandas", "numpy", "pyarrow", "openpyxl", "python_calamine", "streamlit.components.v1")
+
+def import_time(code):
+    """(segundos acumulados de las importaciones de primer nivel, [(módulo, s)] más pesados,
+    módulos pesados cargados)."""
+    # el marcador separa las importaciones del arranque del intérprete (site, encodings...) de las medidas
+    probe = (f"import sys; sys.stderr.write('--\\n'); {code}; "
+             f"print(*[m for m in {HEAVY_MODULES!r} if m in sys.modules])")
+    proc = subprocess.run([sys.executable, "-X", "importtime", "-c", probe], cwd=ROOT, capture_output=True,
+                          text=True, check=True)
+    top = []
+    for line in proc.stderr.split("--\n", 1)[-1].splitlines():
+        if not line.startswith("import time:") or "|" not in line:
+            continue
+        _, cumulative, name = line.split("|")
+        if name.startswith(" ") and not name.startswith("  ") and cumulative.strip().isdigit():
+            top.append((name.strip(), int(cumulative) / 1e6))
+    return sum(t for _, t in top), sorted(top, key=lambda x: -x[1])[:3], proc.stdout.split()
+
+def bench_imports(args):
+    """Cada importación en un proceso nuevo (mejor de --repeat corridas)."""
+    rows = []
+    for label, code in IMPORT_TARGETS.items():
+        module = code.split()[-1]
+        if importlib.util.find_spec(module) is None:
+            continue
+        secs, heaviest, loaded = min((import_time(code) for _ in range(args.repeat)), key=lambda r: r[0])
+        rows.append({
+            "stage": f"import[{label}]",
+            "rows": 0,
+            "seconds": round(secs, 6),
+            "throughput": None,
+            "throughput_unit": None,
+            "peak_mb": None,
+            "heaviest": [[name, round(t, 6)] for name, t in heaviest],
+            "loaded": loaded,
+        })
+        print(f"  {label:<26} {secs * 1000:9.1f} ms  "
+              f"(más pesados: {', '.join(f'{n} {t * 1000:.0f} ms' for n, t in heaviest)}; "
+              f"cargados: {', '.join(loaded) or 'ninguno'})")
+    return rows
+
+# =========================
+# Resultados
+# =========================
+def git_revision():
+    try:
+        return subprocess.run(["git", "rev-parse", "--short", "HEAD"], cwd=ROOT, capture_output=True,
+                              text=True, check=True).stdout.strip()
+    except Exception:
+        return None
+
+def compare(old_path, results):
+    with open(old_path, encoding="utf-8") as fh:
+        old = {(r["stage"], r["rows"]): r for r in json.load(fh)["results"]}
+    print(f"\nComparación con {old_path} (tiempo nuevo / anterior):")
+    for r in results:
+        prev = old.get((r["stage"], r["rows"]))
+        if prev and prev["seconds"]:
+            print(f"  {r['stage']:<20} {r['rows']:>9} filas  x{r['seconds'] / prev['seconds']:.2f}")
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmarks del conversor Excel -> tabla HTML.")
+    parser.add_argument("--sizes", type=int, nargs="+", default=DEFAULT_SIZES, help="cantidades de filas")
+    parser.add_argument("--repeat", type=int, default=3, help="corridas por etapa (se toma la mejor)")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--workdir", default=os.path.join(ROOT, ".bench_cache"),
+                        help="dónde guardar los .xlsx sintéticos")
+    parser.add_argument("--no-memory", dest="memory", action="store_false", help="no medir el pico de memoria")
+    parser.add_argument("-o", "--output", default="bench_results.json", help="archivo JSON de resultados")
+    parser.add_argument("--compare", help="JSON de una corrida anterior para comparar")
+    parser.add_argument("--adversarial-bytes", type=int, default=1 << 20,
+                        help="tamaño de las entradas adversarias del saneador (0 = no medir)")
+    parser.add_argument("--no-imports", dest="imports", action="store_false",
+                        help="no medir el tiempo de importación en frío")
+    parser.add_argument("--engines", nargs="+", default=available_engines(),
+                        help="motores de lectura de .xlsx a medir (por defecto: todos los instalados)")
+    args = parser.parse_args(argv)
+
+    results, engine_checks, checks = [], [], []
+    if args.imports:
+        print("Importación en frío (-X importtime):")
+        results.extend(bench_imports(args))
+    for n_rows in args.sizes:
+        print(f"{n_rows} filas:")
+        results.extend(bench_size(n_rows, args, engine_checks, checks))
+    if args.adversarial_bytes:
+        print("Saneador con entradas adversarias:")
+        results.extend(bench_adversarial(args))
+
+    payload = {
+        "meta": {
+            "git": git_revision(),
+            "timestamp": dt.datetime.now().isoformat(timespec="seconds"),
+            "python": platform.python_version(),
+            "pandas": pd.__version__,
+            "platform": platform.platform(),
+            "excel_engines": available_engines(),
+        },
+        "results": results,
+        "engine_checks": engine_checks,
+        "checks": checks,
+    }
+    with open(args.output, "w", encoding="utf-8") as fh:
+        json.dump(payload, fh, ensure_ascii=False, indent=2)
+    print(f"\nResultados guardados en {args.output}")
+    if args.compare:
+        compare(args.compare, results)
+    return 0 if all(c["equal"] for c in engine_checks + checks) else 1
+
+if __name__ == "__main__":
+    sys.exit(main())
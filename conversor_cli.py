@@ -0,0 +1,145 @@
+"""Conversión por lotes: aplica una plantilla JSON a una carpeta (o glob) de Excel/ODS/CSV/Parquet, en paralelo.
+
+Uso:
+    python conversor_cli.py plantilla_tabla_canvas.json carpeta_o_glob [-o salida] [-j procesos]
+
+Por cada libro se escriben los mismos tres archivos que descarga la app:
+<nombre>_completo.html, <nombre>_solo_tabla.txt y <nombre>_solo_tabla.html, en la misma subcarpeta
+relativa que la entrada (cursos/sec1/prog.xlsx -> salida/sec1/prog_completo.html).
+"""
+import argparse
+import glob
+import json
+import os
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+
+from conversor_core import (
+    LOGICAL_FIELDS, DEFAULT_HEADERS_LABELS, INPUT_FORMATS, FORMAT_ENGINES,
+    input_format, read_header, read_mapped_columns, resolve_map_cols, missing_required, apply_column_mapping,
+    normalize_date_column, complete_link_columns, ensure_unique_order, style_from_config,
+    build_user_block, build_title_html, iter_table_html, iter_table_page, write_fragments,
+)
+
+INPUT_PATTERNS = tuple("*" + ext for ext in INPUT_FORMATS)
+ENGINE_CHOICES = ("auto",) + tuple(dict.fromkeys(e for engines in FORMAT_ENGINES.values() for e in engines))
+
+def find_workbooks(source):
+    """Archivos de entrada a partir de una carpeta o un patrón glob (ignora temporales ~$ de Excel).
+
+    Del glob solo se toman archivos con una extensión de INPUT_FORMATS (no carpetas ni otros tipos).
+    """
+    if os.path.isdir(source):
+        paths = [p for pat in INPUT_PATTERNS for p in glob.glob(os.path.join(source, pat))]
+    else:
+        paths = glob.glob(source, recursive=True)
+    return sorted(p for p in paths
+                  if os.path.isfile(p) and os.path.splitext(p)[1].lower() in INPUT_FORMATS
+                  and not os.path.basename(p).startswith("~$"))
+
+def output_stems(paths, source, out_dir):
+    """{entrada: ruta de salida sin sufijo}, replicando bajo out_dir la subcarpeta de cada entrada.
+
+    La base es la carpeta de origen o, para un glob, la carpeta común a todas las entradas.
+    Lanza ValueError si dos entradas producirían los mismos archivos (p. ej. prog.xlsx y prog.csv).
+    """
+    if os.path.isdir(source):
+        base = os.path.abspath(source)
+    else:
+        base = os.path.commonpath([os.path.dirname(os.path.abspath(p)) for p in paths])
+    stems, targets = {}, {}
+    for p in paths:
+        rel = os.path.splitext(os.path.relpath(os.path.abspath(p), base))[0]
+        stem = os.path.join(out_dir, rel)
+        key = os.path.normcase(os.path.abspath(stem))
+        if key in targets:
+            raise ValueError(f"{targets[key]} y {p} escribirían las mismas salidas ({stem}_*)")
+        stems[p], targets[key] = stem, p
+    return stems
+
+def convert_workbook(path, conf, stem, engine="auto"):
+    """Lee un archivo, aplica la plantilla y escribe sus tres salidas en <stem>_*.
+
+    Devuelve (filas, motor, fechas sin interpretar, segundos).
+    """
+    t0 = time.perf_counter()
+    fmt = input_format(path)
+    colnames = list(read_header(path, engine=engine, fmt=fmt).columns)
+    map_cols = resolve_map_cols(colnames, conf.get("map_cols", {}))
+    missing = missing_required(map_cols)
+    if missing:
+        raise ValueError(f"faltan asignaciones para: {', '.join(missing)}")
+
+    df_raw = read_mapped_columns(path, colnames, map_cols, engine=engine, fmt=fmt)
+    df = apply_column_mapping(df_raw, map_cols)
+    normalize_date_column(df)
+    complete_link_columns(df)
+
+    style = style_from_config(conf)
+    headers = conf.get("header_labels", DEFAULT_HEADERS_LABELS)
+    order = ensure_unique_order(list(conf.get("display_order", LOGICAL_FIELDS)))
+    hidden = set(conf.get("hidden_columns", []))
+    titulo = conf.get("titulo_principal", "Programación de encuentros sincrónicos")
+    compact_html = bool(conf.get("compact_html", False))
+    user_block = build_user_block(conf.get("texto_html", ""), style, bool(conf.get("protect_table", True)))
+
+    # la tabla se genera una sola vez y se reutiliza para las tres salidas
+    table_html = "".join(iter_table_html(df, headers, order, hidden, style, compact_html))
+    os.makedirs(os.path.dirname(stem) or ".", exist_ok=True)
+    outputs = {
+        f"{stem}_completo.html": (user_block, build_title_html(titulo, style, compact_html), table_html),
+        f"{stem}_solo_tabla.txt": (table_html,),
+        f"{stem}_solo_tabla.html": iter_table_page([table_html]),
+    }
+    for out_path, fragments in outputs.items():
+        with open(out_path, "w", encoding="utf-8") as fh:
+            write_fragments(fragments, fh)
+    return len(df), df_raw.attrs["read_engine"], df.attrs.get("date_failures", 0), time.perf_counter() - t0
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(
+        description="Genera las tablas HTML de Canvas para muchos archivos con una plantilla.")
+    parser.add_argument("plantilla", help="plantilla JSON exportada desde la app")
+    parser.add_argument("origen", help="carpeta con archivos .xlsx/.ods/.csv/.parquet "
+                                       "o patrón glob (p. ej. 'cursos/**/*.xlsx')")
+    parser.add_argument("-o", "--salida", default="salida_html", help="carpeta de salida (por defecto: salida_html)")
+    parser.add_argument("-j", "--procesos", type=int, default=None,
+                        help="procesos en paralelo (por defecto: todos los núcleos)")
+    parser.add_argument("--motor", choices=ENGINE_CHOICES, default="auto",
+                        help="motor de lectura (auto: el más rápido instalado para cada formato; "
+                             "un motor que no corresponde al formato también equivale a auto)")
+    args = parser.parse_args(argv)
+
+    with open(args.plantilla, encoding="utf-8") as fh:
+        conf = json.load(fh)
+    paths = find_workbooks(args.origen)
+    if not paths:
+        print(f"No se encontraron archivos de entrada en {args.origen}", file=sys.stderr)
+        return 1
+    try:
+        stems = output_stems(paths, args.origen, args.salida)
+    except ValueError as e:
+        print(f"ERROR  {e}", file=sys.stderr)
+        return 1
+    os.makedirs(args.salida, exist_ok=True)
+
+    errores = 0
+    t0 = time.perf_counter()
+    with ProcessPoolExecutor(max_workers=args.procesos) as pool:
+        futures = {pool.submit(convert_workbook, p, conf, stems[p], args.motor): p for p in paths}
+        for fut in as_completed(futures):
+            path = futures[fut]
+            try:
+                filas, motor, fechas_fallidas, segundos = fut.result()
+                aviso = f", {fechas_fallidas} fechas sin interpretar" if fechas_fallidas else ""
+                print(f"OK     {path} ({filas} filas, {motor}{aviso}, {segundos:.2f}s)")
+            except Exception as e:
+                errores += 1
+                print(f"ERROR  {path}: {e}", file=sys.stderr)
+    print(f"{len(paths) - errores}/{len(paths)} libros convertidos "
+          f"en {time.perf_counter() - t0:.2f}s -> {args.salida}")
+    return 1 if errores else 0
+
+if __name__ == "__main__":
+    sys.exit(main())
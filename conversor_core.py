@@ -0,0 +1,1158 @@
+"""Núcleo de la conversión Excel -> tabla HTML para Canvas (sin interfaz Streamlit)."""
+import base64
+import gzip
+import re
+import sys
+import time
+import datetime
+import hashlib
+import importlib.util
+import io
+import threading
+import zipfile
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from functools import lru_cache
+from itertools import chain, repeat
+
+class LazyModule:
+    """Módulo que se importa recién al usar su primer atributo (el arranque en frío no paga pandas/numpy).
+
+    import_module ya serializa importaciones concurrentes; cada atributo usado se guarda en la
+    instancia, así que los accesos siguientes no vuelven a pasar por __getattr__.
+    """
+    def __init__(self, name):
+        self._name = name
+
+    def __getattr__(self, attr):
+        value = getattr(importlib.import_module(self._name), attr)
+        setattr(self, attr, value)
+        return value
+
+    def __repr__(self):
+        return f"<módulo diferido {self._name!r}>"
+
+pd = LazyModule("pandas")
+np = LazyModule("numpy")
+
+# =========================
+# Constantes / Utilidades
+# =========================
+LOGICAL_FIELDS = [
+    "Unidad Didáctica",
+    "Tema del encuentro",
+    "Duración",
+    "Fecha de realización",
+    "Enlace de Conexión",
+    "Enlace de Grabación",
+]
+
+DEFAULT_EXPECTED = {
+    "Unidad Didáctica": "Unidad Didáctica",
+    "Tema del encuentro": "Tema del encuentro",
+    "Duración": "Duración ",
+    "Fecha de realización": "Fecha  de realización",
+    "Enlace de Conexión": "Enlace de Conexión",
+    "Enlace de Grabación": "Enlace de Grabación",
+}
+
+DEFAULT_HEADERS_LABELS = {
+    "Unidad Didáctica": "Unidad Didáctica",
+    "Tema del encuentro": "Tema del encuentro",
+    "Duración": "Duración",
+    "Fecha de realización": "Fecha de realización",
+    "Enlace de Conexión": "Enlace de Conexión",
+    "Enlace de Grabación": "Enlace de Grabación",
+}
+
+def labelize(x) -> str:
+    try:
+        s = str(x)
+    except Exception:
+        s = repr(x)
+    return s
+
+def safe_index(seq, value):
+    try:
+        return seq.index(value)
+    except ValueError:
+        return 0
+
+def best_default(colnames, target):
+    """Mejor coincidencia de nombre de columna. Soporta cabeceras no-string."""
+    def norm_one(x):
+        s = str(x)
+        return " ".join(s.strip().lower().split())
+
+    aliases = {"duración ": "duración", "fecha  de realización": "fecha de realización"}
+    target_norm = norm_one(aliases.get(target, target))
+
+    for orig in colnames:
+        if norm_one(orig) == target_norm:
+            return orig
+
+    hints = {
+        "Unidad Didáctica": ["unidad"],
+        "Tema del encuentro": ["tema"],
+        "Duración": ["duración", "duracion"],
+        "Fecha de realización": ["fecha"],
+        "Enlace de Conexión": ["conexión", "conexion", "enlace"],
+        "Enlace de Grabación": ["grabación", "grabacion"],
+    }
+    for orig in colnames:
+        n = norm_one(orig)
+        for h in hints.get(target, []):
+            if h in n:
+                return orig
+    return None
+
+def ensure_unique_order(order_list):
+    if sorted(order_list) != sorted(LOGICAL_FIELDS):
+        return LOGICAL_FIELDS[:]
+    if len(set(order_list)) != len(order_list):
+        return LOGICAL_FIELDS[:]
+    return order_list
+
+# ====== Mapeo de columnas y preparación del DataFrame ======
+REQUIRED_FIELDS = ["Unidad Didáctica", "Tema del encuentro", "Duración", "Fecha de realización"]
+
+def resolve_map_cols(colnames, tpl_map=None):
+    """Columna de origen por campo lógico: la de la plantilla si existe en el Excel, si no la mejor coincidencia."""
+    tpl_map = tpl_map or {}
+    map_cols = {}
+    for lfield in LOGICAL_FIELDS:
+        tpl_val = tpl_map.get(lfield)
+        if tpl_val in colnames:
+            map_cols[lfield] = tpl_val
+        else:
+            cand = best_default(colnames, DEFAULT_EXPECTED[lfield])
+            map_cols[lfield] = cand if cand is not None else "(ninguna)"
+    return map_cols
+
+def missing_required(map_cols):
+    return [lf for lf in REQUIRED_FIELDS if map_cols.get(lf) in (None, "(ninguna)")]
+
+def apply_column_mapping(df_raw, map_cols):
+    """Renombra las columnas mapeadas a sus campos lógicos y descarta el resto."""
+    rename_dict = {src: lf for lf, src in map_cols.items() if src and src != "(ninguna)"}
+    df = df_raw.rename(columns=rename_dict)
+    keep_cols = [c for c in LOGICAL_FIELDS if c in df.columns]
+    return df[keep_cols].copy()
+
+# ====== Fechas: cada valor distinto se interpreta una sola vez ======
+SPANISH_MONTHS = {"ene": 1, "feb": 2, "mar": 3, "abr": 4, "may": 5, "jun": 6,
+                  "jul": 7, "ago": 8, "sep": 9, "set": 9, "oct": 10, "nov": 11, "dic": 12}
+SPANISH_DATE_RE = re.compile(
+    r"^(?:(?:lunes|martes|mi[eé]rcoles|jueves|viernes|s[aá]bado|domingo|lun|mar|mi[eé]|jue|vie|s[aá]b|dom)\.?,?\s+)?"
+    r"(\d{1,2})(?:\s+de)?[\s/-]+([a-záéíóú]{3,})\.?(?:\s+del?)?[\s/-]+(\d{4})\b")
+EXCEL_EPOCH = datetime.datetime(1899, 12, 30)
+EXCEL_SERIAL_RANGE = (1, 109574)   # 1900-01-01 .. 2199-12-31
+
+def _spanish_to_numeric(text):
+    """'12 de marzo de 2026' / 'jueves 12 mar. 2026' -> '12/3/2026'; el resto queda igual."""
+    m = text.str.lower().str.extract(SPANISH_DATE_RE)
+    month = m[1].str[:3].map(SPANISH_MONTHS)
+    ok = (m[0].notna() & month.notna()).to_numpy()
+    if not ok.any():
+        return text
+    out = text.copy()
+    out[ok] = (m[0][ok].astype(str) + "/" + month[ok].astype(int).astype(str) + "/" + m[2][ok].astype(str)).to_numpy()
+    return out
+
+def _as_dates(stamps):
+    """Timestamps (NaT incluidos) -> array de datetime.date / None."""
+    out = np.full(len(stamps), None, dtype=object)
+    ok = stamps.notna().to_numpy()
+    out[ok] = stamps[ok].dt.date.to_numpy(dtype=object)
+    return out
+
+def _parse_unique_dates(uniques):
+    """(fechas, vacíos) para valores distintos: datetimes, seriales de Excel, ISO, dd/mm/aaaa y español."""
+    dates = np.full(len(uniques), None, dtype=object)
+    blank = np.zeros(len(uniques), dtype=bool)
+    kind = uniques.map(lambda v: "date" if isinstance(v, (datetime.date, np.datetime64))
+                       else "num" if isinstance(v, (int, float, np.integer, np.floating)) and not isinstance(v, bool)
+                       else "text").to_numpy()
+
+    is_date = kind == "date"
+    if is_date.any():
+        dates[is_date] = _as_dates(pd.to_datetime(pd.Series(uniques[is_date].tolist()), errors="coerce"))
+
+    text = uniques[kind == "text"].map(str).str.strip()
+    blank[text.index[text == ""]] = True
+    numeric_text = text.str.fullmatch(r"\d+(?:\.\d+)?")
+    serials = pd.concat([uniques[kind == "num"].astype(float), text[numeric_text].astype(float)])
+    serials = serials[serials.between(*EXCEL_SERIAL_RANGE)]
+    if len(serials):
+        dates[serials.index] = _as_dates(pd.Timestamp(EXCEL_EPOCH) + pd.to_timedelta(serials.floordiv(1), unit="D"))
+
+    text = _spanish_to_numeric(text[~numeric_text & (text != "")])
+    if len(text):
+        stamps = pd.to_datetime(text, format="ISO8601", errors="coerce")
+        rest = stamps.isna()
+        if rest.any():
+            stamps[rest] = pd.to_datetime(text[rest], format="mixed", dayfirst=True, errors="coerce")
+        dates[text.index] = _as_dates(stamps)
+    return dates, blank
+
+def parse_dates(values):
+    """(fechas, fallidas): cada valor distinto se interpreta una sola vez y se reexpande por fila.
+
+    Acepta fechas/datetimes reales, seriales de Excel (número o texto numérico), texto ISO o
+    dd/mm/aaaa y fechas en español ("12 de marzo de 2026"). Lo que no se puede interpretar
+    conserva su valor original y se marca en `fallidas`; las celdas vacías siguen vacías.
+    """
+    values = pd.Series(values)
+    if pd.api.types.is_datetime64_any_dtype(values.dtype):
+        return pd.Series(_as_dates(values), index=values.index, dtype=object), pd.Series(False, index=values.index)
+    codes, uniques = pd.factorize(values.to_numpy(dtype=object), use_na_sentinel=True)
+    dates, blank = _parse_unique_dates(pd.Series(uniques, dtype=object))
+    parsed = np.array([d is not None for d in dates], dtype=bool)
+    failed_unique = ~parsed & ~blank
+    present = codes >= 0
+    safe_codes = np.where(present, codes, 0)
+
+    out = values.to_numpy(dtype=object).copy()
+    ok = present & parsed[safe_codes] if len(uniques) else present
+    out[ok] = dates[codes[ok]]
+    failed = present & failed_unique[safe_codes] if len(uniques) else present
+    return pd.Series(out, index=values.index, dtype=object), pd.Series(failed, index=values.index)
+
+def normalize_date_column(df, fecha_col="Fecha de realización"):
+    """Convierte la columna de fechas a datetime.date (ver parse_dates).
+
+    En df.attrs["date_failures"] queda cuántas filas no se pudieron interpretar y en
+    df.attrs["date_failure_examples"] hasta cinco valores distintos de ejemplo.
+    """
+    if fecha_col not in df.columns:
+        return df
+    fechas, fallidas = parse_dates(df[fecha_col])
+    df[fecha_col] = fechas
+    df.attrs["date_failures"] = int(fallidas.sum())
+    df.attrs["date_failure_examples"] = [str(v) for v in pd.unique(fechas[fallidas].to_numpy(dtype=object))[:5]]
+    return df
+
+WEEKDAYS_ES = ("lunes", "martes", "miércoles", "jueves", "viernes", "sábado", "domingo")
+
+class DateIndex:
+    """Filas con fecha ordenadas cronológicamente; un rango se resuelve con dos búsquedas binarias.
+
+    Se arma una vez sobre la columna ya normalizada. Las filas cuyo valor no es una fecha
+    (texto que no se pudo interpretar) quedan aparte en `unparsed`; las vacías (o solo espacios)
+    no se incluyen.
+    """
+
+    def __init__(self, fechas):
+        codes, uniques = pd.factorize(pd.Series(fechas).to_numpy(dtype=object), use_na_sentinel=True)
+        u_is_date = np.array([isinstance(v, datetime.date) for v in uniques], dtype=bool)
+        u_days = np.array([np.datetime64(v, "D") if ok else np.datetime64("NaT")
+                           for v, ok in zip(uniques, u_is_date)], dtype="datetime64[D]")
+        u_blank = np.array([isinstance(v, str) and not v.strip() for v in uniques], dtype=bool)
+        safe_codes = np.where(codes >= 0, codes, 0)
+        present = (codes >= 0) & ~u_blank[safe_codes] if len(uniques) else codes >= 0
+        is_date = present & u_is_date[safe_codes] if len(uniques) else present
+        rows = np.flatnonzero(is_date)
+        days = u_days[codes[rows]]
+        order = np.argsort(days, kind="stable")
+        self.positions = rows[order]   # posiciones de fila, en orden cronológico
+        self.days = days[order]
+        self.unparsed = np.flatnonzero(present & ~is_date)
+
+    def bounds(self):
+        """(primera, última) fecha como datetime.date, o None si no hay ninguna."""
+        if not len(self.days):
+            return None
+        return self.days[0].item(), self.days[-1].item()
+
+    def select(self, start=None, end=None, weekdays=None, include_unparsed=False):
+        """Posiciones, en el orden original de las filas, con fecha en [start, end] y en esos días (lunes = 0)."""
+        lo = 0 if start is None else np.searchsorted(self.days, np.datetime64(start, "D"), "left")
+        hi = len(self.days) if end is None else np.searchsorted(self.days, np.datetime64(end, "D"), "right")
+        positions, days = self.positions[lo:hi], self.days[lo:hi]
+        if weekdays:
+            weekday = (days.astype(np.int64) + 3) % 7   # 1970-01-01 fue jueves
+            positions = positions[np.isin(weekday, list(weekdays))]
+        if include_unparsed:
+            positions = np.concatenate([positions, self.unparsed])
+        return np.sort(positions)
+
+def complete_link_columns(df, enlace_conexion_global=""):
+    """Aplica el enlace global (si hay) y asegura que existan las columnas de enlaces."""
+    if enlace_conexion_global.strip():
+        df["Enlace de Conexión"] = enlace_conexion_global.strip()
+    else:
+        if "Enlace de Conexión" not in df.columns:
+            df["Enlace de Conexión"] = ""
+    if "Enlace de Grabación" not in df.columns:
+        df["Enlace de Grabación"] = ""
+    return df
+
+# ====== Formatos de entrada y motores de lectura (el más rápido instalado, con respaldo) ======
+INPUT_FORMATS = {".xlsx": "excel", ".ods": "ods", ".csv": "csv", ".parquet": "parquet"}
+FORMAT_ENGINES = {   # orden de preferencia; el último es el respaldo
+    "excel": ("calamine", "openpyxl"),
+    "ods": ("calamine", "odf"),
+    "csv": ("pyarrow", "c"),
+    "parquet": ("pyarrow", "fastparquet"),
+}
+ENGINE_MODULES = {"calamine": "python_calamine", "openpyxl": "openpyxl", "odf": "odf",
+                  "pyarrow": "pyarrow", "fastparquet": "fastparquet", "c": None}
+CSV_DELIMITERS = ",;\t|"
+
+def input_format(filename):
+    """Formato lógico ("excel", "ods", "csv", "parquet") según la extensión del archivo."""
+    ext = ("." + str(filename).rsplit(".", 1)[-1].lower()) if "." in str(filename) else ""
+    if ext not in INPUT_FORMATS:
+        raise ValueError(f"formato no soportado: {filename} (se aceptan {', '.join(INPUT_FORMATS)})")
+    return INPUT_FORMATS[ext]
+
+def available_engines(fmt="excel"):
+    """Motores instalados para el formato, del más rápido al más lento."""
+    return [e for e in FORMAT_ENGINES[fmt]
+            if ENGINE_MODULES[e] is None or importlib.util.find_spec(ENGINE_MODULES[e]) is not None]
+
+def resolve_engine(engine="auto", fmt="excel"):
+    """Motor concreto: "auto", None o un motor de otro formato eligen el más rápido instalado."""
+    if engine not in FORMAT_ENGINES[fmt]:
+        engines = available_engines(fmt)
+        return engines[0] if engines else FORMAT_ENGINES[fmt][-1]
+    return engine
+
+def _peek(source, n_bytes):
+    if hasattr(source, "read"):
+        pos = source.tell()
+        head = source.read(n_bytes)
+        source.seek(pos)
+        return head
+    with open(source, "rb") as fh:
+        return fh.read(n_bytes)
+
+def csv_options(source):
+    """Separador y codificación de un CSV, deducidos de su primer bloque (UTF-8 o, si no, cp1252)."""
+    head = _peek(source, 1 << 16)
+    try:
+        text, encoding = head.decode("utf-8-sig"), "utf-8-sig"
+    except UnicodeDecodeError as e:
+        if e.start >= len(head) - 3:   # carácter multibyte cortado al final del bloque
+            text, encoding = head[:e.start].decode("utf-8-sig"), "utf-8-sig"
+        else:
+            text, encoding = head.decode("cp1252", errors="replace"), "cp1252"
+    first_line = text.splitlines()[0] if text else ""
+    sep = max(CSV_DELIMITERS, key=first_line.count)
+    return {"sep": sep if first_line.count(sep) else ",", "encoding": encoding}
+
+def _with_colnames(df, colnames, positions):
+    df.columns = [colnames[i] for i in positions]
+    return df
+
+def _read_spreadsheet(source, engine, sheet_name=0, colnames=None, positions=None):
+    if positions is None:
+        return pd.read_excel(source, engine=engine, sheet_name=sheet_name, nrows=0)
+    df = pd.read_excel(source, engine=engine, sheet_name=sheet_name, usecols=positions)
+    return _with_colnames(df, colnames, positions)
+
+def _csv_raw_header(source, opts):
+    """Primera fila del CSV tal cual (sin los "Otro.1" / "Unnamed: 3" que agrega el motor C)."""
+    pos = source.tell() if hasattr(source, "read") else None
+    row = pd.read_csv(source, engine="c", header=None, nrows=1, dtype=str, keep_default_na=False, **opts)
+    if pos is not None:
+        source.seek(pos)
+    return row.iloc[0].tolist() if len(row) else []
+
+def _read_csv(source, engine, sheet_name=0, colnames=None, positions=None):
+    opts = csv_options(source)
+    if positions is None:   # pyarrow no admite nrows
+        return pd.read_csv(source, engine="c", nrows=0, **opts)
+    # pyarrow solo acepta nombres en usecols; el motor C, posiciones (seguras con encabezados repetidos)
+    usecols = [colnames[i] for i in positions] if engine == "pyarrow" else positions
+    if engine == "pyarrow":
+        raw = _csv_raw_header(source, opts)
+        if any(raw.count(name) != 1 for name in usecols):   # repetido, vacío o renombrado por el motor C
+            raise ValueError("pyarrow no puede elegir columnas con encabezados repetidos o vacíos")
+    df = pd.read_csv(source, engine=engine, usecols=usecols, **opts)
+    return _with_colnames(df, colnames, positions)
+
+def _read_parquet(source, engine, sheet_name=0, colnames=None, positions=None):
+    if positions is None:   # solo el esquema, sin leer datos
+        if engine == "pyarrow":
+            import pyarrow.parquet as pq
+            schema = pq.read_schema(source)
+            index_cols = (schema.pandas_metadata or {}).get("index_columns", [])
+            names = [n for n in schema.names if n not in index_cols]
+        else:
+            import fastparquet
+            names = list(fastparquet.ParquetFile(source).columns)
+        return pd.DataFrame(columns=names)
+    df = pd.read_parquet(source, engine=engine, columns=[colnames[i] for i in positions])
+    return _with_colnames(df, colnames, positions)
+
+_READERS = {"excel": _read_spreadsheet, "ods": _read_spreadsheet, "csv": _read_csv, "parquet": _read_parquet}
+
+def _read_all_sheets(source, engine, **kwargs):
+    return pd.read_excel(source, engine=engine, sheet_name=None)
+
+def _fallback_errors():
+    """Errores que justifican reintentar con el motor de respaldo (los de pyarrow, si ya se importó)."""
+    pa = sys.modules.get("pyarrow")
+    return (ImportError, ValueError) + ((pa.lib.ArrowException,) if pa is not None else ())
+
+def read_timed(source, fmt="excel", engine="auto", reader=None, **kwargs):
+    """Lee con el motor pedido; si falla, reintenta con el motor de respaldo del formato.
+
+    Devuelve el DataFrame (o el dict de DataFrames por hoja) con attrs["read_engine"] y attrs["read_seconds"].
+    """
+    reader = reader or _READERS[fmt]
+    engine = resolve_engine(engine, fmt)
+    fallback = FORMAT_ENGINES[fmt][-1]
+    t0 = time.perf_counter()
+    try:
+        df = reader(source, engine, **kwargs)
+    except _fallback_errors():
+        if engine == fallback:
+            raise
+        if hasattr(source, "seek"):
+            source.seek(0)
+        engine = fallback
+        t0 = time.perf_counter()
+        df = reader(source, engine, **kwargs)
+    seconds = time.perf_counter() - t0
+    for frame in (df.values() if isinstance(df, dict) else [df]):
+        frame.attrs["read_engine"] = engine
+        frame.attrs["read_seconds"] = seconds
+    return df
+
+def read_all_sheets(source, engine="auto", fmt="excel"):
+    """{hoja: DataFrame} de todas las hojas de un libro .xlsx/.ods, en una sola pasada."""
+    if fmt not in ("excel", "ods"):
+        raise ValueError("el modo varias hojas solo aplica a libros .xlsx/.ods")
+    return read_timed(source, fmt, engine, reader=_read_all_sheets)
+
+# ====== Lectura: primero encabezados, luego solo las columnas mapeadas ======
+def read_header(source, sheet_name=0, engine="auto", fmt="excel"):
+    """DataFrame vacío con los encabezados (solo se lee la primera fila o el esquema)."""
+    return read_timed(source, fmt, engine, sheet_name=sheet_name)
+
+def mapped_positions(colnames, map_cols):
+    """Posiciones, en el orden de la hoja, de las columnas asignadas a algún campo lógico."""
+    wanted = {src for src in map_cols.values() if src and src != "(ninguna)"}
+    return [i for i, c in enumerate(colnames) if c in wanted]
+
+def read_mapped_columns(source, colnames, map_cols, sheet_name=0, engine="auto", fmt="excel"):
+    """Lee solo las columnas mapeadas; se eligen por posición para respetar encabezados repetidos."""
+    return read_timed(source, fmt, engine, sheet_name=sheet_name, colnames=colnames,
+                      positions=mapped_positions(colnames, map_cols))
+
+# ====== Cachés LRU/TTL con techo de bytes ======
+class LRUCache:
+    """Caché LRU con expiración por TTL, un techo de memoria total y contadores de aciertos/fallos.
+
+    Los valores devueltos se comparten entre reruns y sesiones, así que no deben mutarse in-place.
+    """
+
+    def __init__(self, max_entries=8, ttl_seconds=3600, max_bytes=512 * 1024 * 1024):
+        self.max_entries = max_entries
+        self.ttl_seconds = ttl_seconds
+        self.max_bytes = max_bytes
+        self.hits = 0
+        self.misses = 0
+        self._items = OrderedDict()  # key -> (value, nbytes, stored_at)
+        self._total_bytes = 0
+        self._lock = threading.Lock()
+
+    def sizeof(self, value):
+        return 0
+
+    def _drop(self, key):
+        _, nbytes, _ = self._items.pop(key)
+        self._total_bytes -= nbytes
+
+    def get(self, key):
+        with self._lock:
+            item = self._items.get(key)
+            if item is not None and self.ttl_seconds and time.monotonic() - item[2] > self.ttl_seconds:
+                self._drop(key)
+                item = None
+            if item is None:
+                self.misses += 1
+                return None
+            self.hits += 1
+            self._items.move_to_end(key)
+            return item[0]
+
+    def put(self, key, value):
+        nbytes = self.sizeof(value)
+        if nbytes > self.max_bytes:
+            return  # demasiado grande para cachear; se recalcula la próxima vez
+        with self._lock:
+            if key in self._items:
+                self._drop(key)
+            self._items[key] = (value, nbytes, time.monotonic())
+            self._total_bytes += nbytes
+            while self._items and (len(self._items) > self.max_entries or self._total_bytes > self.max_bytes):
+                self._drop(next(iter(self._items)))
+
+    def get_or_compute(self, key, compute):
+        value = self.get(key)
+        if value is None:
+            value = compute()
+            self.put(key, value)
+        return value
+
+    def stats(self):
+        with self._lock:
+            return {"hits": self.hits, "misses": self.misses, "entries": len(self._items), "bytes": self._total_bytes}
+
+class WorkbookCache(LRUCache):
+    """DataFrames parseados (o dicts de hojas); la clave es (sha256 del archivo, hoja, motor, columnas leídas)."""
+
+    def sizeof(self, df):
+        if isinstance(df, dict):   # todas las hojas de un libro
+            return sum(self.sizeof(frame) for frame in df.values())
+        return int(df.memory_usage(deep=True).sum())
+
+class OutputCache(LRUCache):
+    """Salidas HTML ya generadas, por huella de datos + configuración.
+
+    Cada entrada guarda la tabla una sola vez, como (bloque de usuario + título, tabla); el HTML
+    completo y la página se rearman al leerla (ver render_outputs). El tamaño se mide en bytes UTF-8.
+    """
+
+    def __init__(self, max_entries=16, ttl_seconds=3600, max_bytes=256 * 1024 * 1024):
+        super().__init__(max_entries, ttl_seconds, max_bytes)
+
+    def sizeof(self, parts):
+        return sum(len(s.encode("utf-8")) for s in parts)
+
+class UserBlockCache(LRUCache):
+    """Bloques de usuario ya saneados y encapsulados, por (sha256 del texto, proteger, fuente)."""
+
+    def __init__(self, max_entries=32, ttl_seconds=None, max_bytes=64 * 1024 * 1024):
+        super().__init__(max_entries, ttl_seconds, max_bytes)
+
+    def sizeof(self, block):
+        return len(block.encode("utf-8"))   # bytes, como OutputCache (tildes y emoji ocupan más de uno)
+
+USER_BLOCK_CACHE = UserBlockCache()
+
+def dataframe_fingerprint(df):
+    """Huella estable del contenido (valores, índice, columnas y tipos) de un DataFrame."""
+    h = hashlib.sha256()
+    h.update(repr([(str(c), str(t)) for c, t in df.dtypes.items()]).encode("utf-8"))
+    h.update(pd.util.hash_pandas_object(df, index=True).to_numpy().tobytes())
+    return h.hexdigest()
+
+# ====== Estilos (color + fuente + compacto + alineación + bordes) ======
+def make_style(primary="#ba372a", compact=False, font_family="Arial, Helvetica, sans-serif",
+               tema_left=False, show_th_borders=True, show_td_borders=True):
+    th_border = f"1px solid {primary}" if show_th_borders else "0"
+    td_border = f"1px solid {primary}" if show_td_borders else "0"
+    return {
+        "primary": primary,
+        "font": font_family,
+        "title_size": "14pt" if compact else "16pt",
+        "header_font": "11pt" if compact else "12pt",
+        "cell_font": "10pt" if compact else "11pt",
+        "padding": "4px" if compact else "8px",
+        "tema_main": "11pt" if compact else "11.5pt",
+        "tema_sub": "9.5pt" if compact else "10pt",
+        "tema_align": "left" if tema_left else "center",
+        "cell_align_default": "center",
+        "th_border": th_border,
+        "td_border": td_border,
+    }
+
+def short_color(color):
+    """#aabbcc -> #abc cuando se puede (mismo color, menos bytes)."""
+    c = (color or "").lower()
+    if re.fullmatch(r"#([0-9a-f])\1([0-9a-f])\2([0-9a-f])\3", c):
+        return "#" + c[1] + c[3] + c[5]
+    return color
+
+def style_tags(style, compact_html=False):
+    """Etiquetas de apertura/cierre que usa el renderizador para un estilo dado.
+
+    Se compilan una sola vez por configuración de estilo (memoizadas por los valores de
+    make_style); el dict devuelto se comparte entre llamadas y no debe modificarse.
+    """
+    return _compile_style_tags(tuple(sorted(style.items())), bool(compact_html))
+
+@lru_cache(maxsize=64)
+def _compile_style_tags(style_items, compact_html):
+    """En modo compacto se emiten solo las declaraciones necesarias: fuente, tamaño, color y
+    alineación se declaran una vez en <table> y se heredan; se omiten valores por defecto
+    del navegador (bordes en 0, negrita en <th>) y los colores se acortan.
+    """
+    style = dict(style_items)
+    if not compact_html:
+        outer_border = f"1px solid {style['primary']}"
+        td_open = {}
+        for align in {style["tema_align"], style["cell_align_default"]}:
+            td_open[align] = (
+                f'<td style="text-align: {align}; font-family: {style["font"]}; '
+                f'font-size: {style["cell_font"]}; color: #404e5c; border: {style["td_border"]}; '
+                f'padding: {style["padding"]};">'
+            )
+        return {
+            "table_open": f'<table style="border-collapse: collapse; width: 100%; border: {outer_border};">\n<tr>\n',
+            "th_open": (
+                f'<th style="background-color: {style["primary"]}; color: #fff; text-align: center; '
+                f'font-family: {style["font"]}; font-size: {style["header_font"]}; font-weight: bold; '
+                f'padding: {style["padding"]}; border: {style["th_border"]};">'
+            ),
+            "th_close": "</th>\n",
+            "head_close": "</tr>\n",
+            "row_open": "<tr>\n",
+            "td_open": td_open,
+            "td_close": "</td>\n",
+            "row_close": "</tr>\n",
+            "table_close": "</table>",
+            "tema_main_open": f'<span style="font-weight: bold; color: #404e5c; font-size: {style["tema_main"]};">',
+            "tema_sub_sep": f'</span><br><span style="color: #7b858d; font-size: {style["tema_sub"]};">',
+            "enlace_close": (
+                '" target="_blank" '
+                f'style="color: {style["primary"]}; font-weight: bold; text-decoration: underline; '
+                f'font-family: {style["font"]}; font-size: {style["cell_font"]};">'
+                f'ENLACE <span style="font-size:10pt;">&#8594;</span></a>'
+            ),
+            "grabacion": (f'<span style="color: #404e5c; font-weight: bold; '
+                          f'font-family: {style["font"]}; font-size: {style["cell_font"]};">GRABACIÓN</span>'),
+        }
+
+    primary = short_color(style["primary"])
+
+    def border(value):
+        return "" if value == "0" else f";border:{value.replace(style['primary'], primary)}"
+
+    td_open = {}
+    for align in {style["tema_align"], style["cell_align_default"]}:
+        align_decl = "" if align == style["cell_align_default"] else f"text-align:{align};"
+        td_open[align] = f'<td style="{align_decl}padding:{style["padding"]}{border(style["td_border"])}">'
+    return {
+        "table_open": (
+            f'<table style="border-collapse:collapse;width:100%;border:1px solid {primary};'
+            f'font-family:{style["font"]};font-size:{style["cell_font"]};color:#404e5c;'
+            f'text-align:{style["cell_align_default"]}"><tr>'
+        ),
+        "th_open": (f'<th style="background-color:{primary};color:#fff;font-size:{style["header_font"]};'
+                    f'padding:{style["padding"]}{border(style["th_border"])}">'),
+        "th_close": "</th>",
+        "head_close": "</tr>",
+        "row_open": "<tr>",
+        "td_open": td_open,
+        "td_close": "</td>",
+        "row_close": "</tr>",
+        "table_close": "</table>",
+        "tema_main_open": f'<span style="font-weight:bold;font-size:{style["tema_main"]}">',
+        "tema_sub_sep": f'</span><br><span style="color:#7b858d;font-size:{style["tema_sub"]}">',
+        "enlace_close": (f'" target="_blank" style="color:{primary};font-weight:bold;text-decoration:underline">'
+                         f'ENLACE <span style="font-size:10pt">&#8594;</span></a>'),
+        "grabacion": '<span style="font-weight:bold">GRABACIÓN</span>',
+    }
+
+# ====== Protección de tabla: sanear y encapsular bloque de usuario ======
+SAFE_TAG_WHITELIST = {"strong","em","b","i","u","a","p","br","hr","ul","ol","li","h1","h2","h3","h4","h5","h6"}
+
+BLOCK_NAMES = ("script", "style")
+BLOCK_OPEN_RE = {names: re.compile(rf"<\s*({'|'.join(names)})\b", re.I)
+                 for names in (BLOCK_NAMES, ("script",), ("style",))}
+BLOCK_CLOSE_RE = {name: re.compile(rf"</\s*{name}\s*>", re.I) for name in BLOCK_NAMES}
+TAG_RE = re.compile(r"<\s*([a-zA-Z0-9]+)[^>]*>|</\s*([a-zA-Z0-9]+)\s*>")
+CLOSE_TAG_RE = re.compile(r"</\s*([a-zA-Z0-9]+)\s*>")
+
+def _escape_tag(tag):
+    return tag.replace("<", "&lt;").replace(">", "&gt;")
+
+def _filter_close_tag(m):
+    tag = m.group(0)
+    return tag if m.group(1).lower() in SAFE_TAG_WHITELIST else _escape_tag(tag)
+
+def _filter_tag(m):
+    tag = m.group(0)
+    if m.group(1) is None:   # cierre
+        return tag if m.group(2).lower() in SAFE_TAG_WHITELIST else _escape_tag(tag)
+    if m.group(1).lower() not in SAFE_TAG_WHITELIST:
+        return _escape_tag(tag)
+    return CLOSE_TAG_RE.sub(_filter_close_tag, tag) if "</" in tag else tag   # p. ej. "<b </div>"
+
+def _strip_script_style(raw):
+    """Quita los bloques <script>…</script> y <style>…</style> (hasta el cierre más cercano).
+
+    El próximo cierre de cada tipo se recuerda y, si ya no quedan cierres de un tipo, se dejan
+    de buscar sus aperturas: el costo es lineal aunque haya miles de aperturas sueltas.
+    """
+    out, pos, start = [], 0, 0
+    names = BLOCK_NAMES
+    closes = {}   # nombre -> (inicio, fin) del próximo cierre
+    while names:
+        m = BLOCK_OPEN_RE[names].search(raw, start)
+        if not m:
+            break
+        name = m.group(1).lower()
+        close = closes.get(name, (-1, -1))
+        if close[0] < m.end():
+            cm = BLOCK_CLOSE_RE[name].search(raw, m.end())
+            if cm is None:   # sin cierre: esta y las siguientes aperturas quedan y se escapan después
+                names = tuple(n for n in names if n != name)
+                start = m.start() + 1
+                continue
+            close = closes[name] = cm.span()
+        out.append(raw[pos:m.start()])
+        pos = start = close[1]
+    out.append(raw[pos:])
+    return "".join(out)
+
+def sanitize_user_html(raw: str) -> str:
+    """Escapa etiquetas peligrosas (table, tr, td, style, script, etc.) y permite solo etiquetas de texto básicas.
+
+    Tiempo lineal: se quitan los bloques script/style y luego aperturas y cierres se filtran con
+    SAFE_TAG_WHITELIST en una sola pasada. Después del último ">" ninguna etiqueta puede cerrarse,
+    así que ese resto se copia tal cual en vez de dejar que cada "<b" suelto lo recorra entero.
+    """
+    if not raw:
+        return ""
+    raw = _strip_script_style(raw)
+    cut = raw.rfind(">") + 1
+    return TAG_RE.sub(_filter_tag, raw[:cut]) + raw[cut:]
+
+def wrap_user_block(html_text: str, font_family: str) -> str:
+    """Aísla el bloque del usuario en un contenedor propio para no afectar la tabla."""
+    if not html_text:
+        return ""
+    return (
+        f"<div style='margin: 0 0 12px 0; font-family:{font_family}; color:#404e5c; font-size:11pt;'>"
+        f"{html_text}"
+        f"</div>"
+    )
+
+def _column_values(df_disp, lfield):
+    """Columna como Series de objetos con índice posicional (o vacía si no existe)."""
+    if lfield in df_disp.columns:
+        return pd.Series(df_disp[lfield].to_numpy(dtype=object), dtype=object)
+    return pd.Series([""] * len(df_disp), dtype=object)
+
+def _as_text(values):
+    """NaN/None -> "" y el resto como str, igual que la celda original."""
+    return values.where(values.notna(), "").map(str).astype(object)
+
+def _per_unique(text, render):
+    """Aplica `render` (operaciones .str vectorizadas) solo a los valores distintos y reexpande."""
+    codes, uniques = pd.factorize(text)
+    rendered = render(pd.Series(uniques, dtype=object)).to_numpy(dtype=object)
+    return pd.Series(rendered[codes], dtype=object)
+
+def render_column_html(lfield, df_disp, style, compact_html=False):
+    """Contenido HTML de todas las celdas de un campo lógico, calculado por columna."""
+    values = _column_values(df_disp, lfield)
+    if values.empty:
+        return values
+    tags = style_tags(style, compact_html)
+
+    if lfield == "Tema del encuentro":
+        main_open, sub_sep = tags["tema_main_open"], tags["tema_sub_sep"]
+
+        def _tema(tema_val):
+            partes = tema_val.str.partition("\n")
+            con_sub = main_open + partes[0].str.strip() + sub_sep + partes[2].str.strip() + '</span>'
+            return con_sub.where(partes[1] != "", main_open + tema_val + '</span>')
+
+        return _per_unique(_as_text(values), _tema)
+
+    if lfield == "Enlace de Conexión":
+        enlace_close = tags["enlace_close"]
+
+        def _enlace(val):
+            return ('<a href="' + val + enlace_close).where(val != "", "")
+
+        val = values.where(values.map(bool), "").map(str).astype(object).str.strip()
+        return _per_unique(val, _enlace)
+
+    if lfield == "Enlace de Grabación":
+        return pd.Series([tags["grabacion"]] * len(values), dtype=object)
+
+    return _as_text(values)
+
+def build_user_block(texto_extra, style, proteger_tabla, cache=USER_BLOCK_CACHE):
+    """Bloque del usuario, saneado/encapsulado (o "" si no hay texto), memoizado en `cache`."""
+    if not texto_extra:
+        return ""
+
+    def _build():
+        user_block = sanitize_user_html(texto_extra) if proteger_tabla else texto_extra
+        return wrap_user_block(user_block, style["font"]) if user_block else ""
+
+    if cache is None:
+        return _build()
+    key = (hashlib.sha256(texto_extra.encode("utf-8")).hexdigest(), bool(proteger_tabla), style["font"])
+    return cache.get_or_compute(key, _build)
+
+def build_title_html(titulo, style, compact_html=False):
+    if compact_html:
+        return (f'<p><span style="font-family:{style["font"]};color:#000;font-size:{style["title_size"]};'
+                f'font-weight:bold">{titulo}</span></p>')
+    return f"""
+    <p style="text-align: left;">
+        <span style="font-family: {style["font"]}; color: #000000; font-size: {style["title_size"]}; font-weight: bold;">
+            {titulo}
+        </span>
+    </p>
+    """
+
+def iter_table_html(df_disp, headers_by_logical, order_list, hidden_set, style, compact_html=False):
+    """Genera la tabla (SOLO la tabla) como fragmentos de texto, sin armar el string completo."""
+    tags = style_tags(style, compact_html)
+    visible = [lfield for lfield in order_list if lfield not in hidden_set]
+    yield tags["table_open"]
+    for lfield in visible:
+        yield tags["th_open"] + str(headers_by_logical.get(lfield, lfield)) + tags["th_close"]
+    yield tags["head_close"]
+
+    # --- cuerpo: cada columna se arma completa y luego se intercalan por fila ---
+    n_rows = len(df_disp)
+    fragments = [repeat(tags["row_open"], n_rows)]
+    for lfield in visible:
+        align = style["tema_align"] if lfield == "Tema del encuentro" else style["cell_align_default"]
+        cells = render_column_html(lfield, df_disp, style, compact_html).tolist()
+        fragments += [repeat(tags["td_open"][align], n_rows), cells, repeat(tags["td_close"], n_rows)]
+    fragments.append(repeat(tags["row_close"], n_rows))
+    yield from chain.from_iterable(zip(*fragments))
+    yield tags["table_close"]
+
+@lru_cache(maxsize=None)
+def _stable_hash(value):
+    """Hash de 64 bits de un valor (str o tupla de str), igual entre procesos."""
+    return int.from_bytes(hashlib.blake2b(repr(value).encode("utf-8"), digest_size=8).digest(), "little")
+
+class _LabelCache:
+    """Fragmentos HTML indexados por etiqueta de fila, con el hash del contenido que los generó."""
+
+    def __init__(self):
+        self.index = pd.Index([])
+        self.hashes = np.empty(0, dtype=np.uint64)
+        self.html = np.empty(0, dtype=object)
+        self.nbytes = 0   # memoria aproximada: strings + arreglos de hashes/punteros + índice
+
+    @staticmethod
+    def _sizeof(index, html):
+        return sum(map(sys.getsizeof, html)) + 16 * len(html) + int(index.memory_usage(deep=True))
+
+    def lookup(self, index, hashes):
+        """(fragmentos, posiciones a recalcular): reutiliza los de igual etiqueta y mismo hash."""
+        pos = self.index.get_indexer(index)
+        fresh = pos >= 0
+        fresh[fresh] = self.hashes[pos[fresh]] == hashes[fresh]
+        html = np.empty(len(index), dtype=object)
+        html[fresh] = self.html[pos[fresh]]
+        return html, np.flatnonzero(~fresh)
+
+    def store(self, index, hashes, html):
+        # se conservan también las filas que ya no están (p. ej. una fecha deseleccionada)
+        keep = ~self.index.isin(index)
+        self.nbytes += self._sizeof(index, html) - self._sizeof(self.index[~keep], self.html[~keep])
+        self.index = self.index[keep].append(index)
+        self.hashes = np.concatenate([self.hashes[keep], hashes])
+        self.html = np.concatenate([self.html[keep], html])
+
+class IncrementalRenderer:
+    """Renderizador con cachés por sección: bloque del usuario, título, encabezados, celdas y filas.
+
+    Celdas y filas se cachean por etiqueta de fila del DataFrame junto con el hash de su
+    contenido, así que editar un encabezado o el título, ocultar una columna o quitar una
+    fecha solo recalcula los fragmentos afectados y vuelve a unir el resto. Cambiar el estilo
+    vacía la caché. Con etiquetas de fila repetidas se renderiza sin caché.
+
+    La memoria tiene un techo (max_bytes): al superarlo se descarta primero la caché de filas
+    (se rearma desde las celdas) y luego las de celdas de los campos usados hace más tiempo.
+    Las tablas de ese tamaño o mayores dejan de usar el nivel que no entró (como LRUCache con
+    los valores más grandes que su techo), para no renderizar y descartar en cada rerun.
+    """
+
+    def __init__(self, max_bytes=128 * 1024 * 1024):
+        self.max_bytes = max_bytes
+        self._rows_limit = float("inf")    # filas desde las que no se cachean filas armadas
+        self._cells_limit = float("inf")   # filas desde las que se renderiza sin caché
+        self.rendered_cells = 0  # celdas renderizadas de verdad (las reutilizadas no cuentan)
+        self.rendered_rows = 0
+        self._style_key = None
+        self._sections = {}           # nombre -> (clave, html)
+        self._cells = OrderedDict()   # lfield -> _LabelCache de '<td ...>...</td>', del menos al más reciente
+        self._rows = _LabelCache()
+
+    def nbytes(self):
+        return self._rows.nbytes + sum(cache.nbytes for cache in self._cells.values())
+
+    def _enforce_max_bytes(self, n_rows):
+        if self.nbytes() <= self.max_bytes:
+            return
+        if len(self._rows.index):
+            self._rows = _LabelCache()
+            self._rows_limit = min(self._rows_limit, n_rows)
+        if self.nbytes() > self.max_bytes:
+            self._cells_limit = min(self._cells_limit, n_rows)
+        while self._cells and self.nbytes() > self.max_bytes:
+            self._cells.popitem(last=False)
+
+    def _section(self, name, key, build):
+        cached = self._sections.get(name)
+        if cached is None or cached[0] != key:
+            cached = (key, build())
+            self._sections[name] = cached
+        return cached[1]
+
+    def _use_style(self, style, compact_html):
+        style_key = (tuple(sorted(style.items())), bool(compact_html))
+        if style_key != self._style_key:
+            self._style_key = style_key
+            self._cells, self._rows = OrderedDict(), _LabelCache()
+        return style_tags(style, compact_html)
+
+    def user_block(self, texto_extra, style, proteger_tabla):
+        return self._section("user_block", (texto_extra, style["font"], bool(proteger_tabla)),
+                             lambda: build_user_block(texto_extra, style, proteger_tabla))
+
+    def title_html(self, titulo, style, compact_html=False):
+        return self._section("title", (titulo, style["font"], style["title_size"], bool(compact_html)),
+                             lambda: build_title_html(titulo, style, compact_html))
+
+    def _column_cells(self, lfield, df_disp, style, compact_html, td_open, td_close):
+        """(hashes, celdas) de un campo; solo se renderizan las filas nuevas o modificadas."""
+        if lfield in df_disp.columns:
+            hashes = pd.util.hash_pandas_object(df_disp[lfield], index=False).to_numpy()
+        else:
+            hashes = np.zeros(len(df_disp), dtype=np.uint64)
+        cache = self._cells.setdefault(lfield, _LabelCache())
+        self._cells.move_to_end(lfield)
+        cells, stale = cache.lookup(df_disp.index, hashes)
+        if len(stale):
+            rendered = render_column_html(lfield, df_disp.iloc[stale], style, compact_html)
+            cells[stale] = (td_open + rendered + td_close).to_numpy(dtype=object)
+            cache.store(df_disp.index[stale], hashes[stale], cells[stale])
+            self.rendered_cells += len(stale)
+        return hashes, cells
+
+    def iter_table_html(self, df_disp, headers_by_logical, order_list, hidden_set, style, compact_html=False):
+        """Mismos fragmentos que iter_table_html(), reutilizando lo ya renderizado."""
+        if not df_disp.index.is_unique or len(df_disp) >= self._cells_limit:
+            yield from iter_table_html(df_disp, headers_by_logical, order_list, hidden_set, style, compact_html)
+            return
+        tags = self._use_style(style, compact_html)
+        visible = tuple(lfield for lfield in order_list if lfield not in hidden_set)
+        labels = tuple(str(headers_by_logical.get(lfield, lfield)) for lfield in visible)
+        yield tags["table_open"]
+        yield self._section("header", (labels, self._style_key), lambda: "".join(
+            tags["th_open"] + label + tags["th_close"] for label in labels) + tags["head_close"])
+
+        # hash de fila = combinación de los hashes de sus celdas visibles, en orden, junto con qué
+        # campos son: dos columnas con el mismo contenido (p. ej. enlaces vacíos) no deben confundirse
+        row_hashes = np.full(len(df_disp), _stable_hash(visible), dtype=np.uint64)
+        columns = []
+        for lfield in visible:
+            align = style["tema_align"] if lfield == "Tema del encuentro" else style["cell_align_default"]
+            hashes, cells = self._column_cells(lfield, df_disp, style, compact_html,
+                                               tags["td_open"][align], tags["td_close"])
+            row_hashes = row_hashes * np.uint64(1000003) ^ (hashes ^ np.uint64(_stable_hash(lfield)))  # módulo 2**64
+            columns.append(cells)
+
+        cache_rows = len(df_disp) < self._rows_limit
+        if cache_rows:
+            rows, stale = self._rows.lookup(df_disp.index, row_hashes)
+        else:
+            rows, stale = np.empty(len(df_disp), dtype=object), np.arange(len(df_disp))
+        if len(stale):
+            row_open, row_close = tags["row_open"], tags["row_close"]
+            rows[stale] = [row_open + "".join(cells) + row_close
+                           for cells in zip(*(col[stale].tolist() for col in columns))] if columns \
+                else [row_open + row_close] * len(stale)
+            if cache_rows:
+                self._rows.store(df_disp.index[stale], row_hashes[stale], rows[stale])
+            self.rendered_rows += len(stale)
+        self._enforce_max_bytes(len(df_disp))
+        yield from rows.tolist()
+        yield tags["table_close"]
+
+TABLE_PAGE_HEAD = "<!doctype html><html><head><meta charset='utf-8'><title>Tabla Canvas</title></head><body>"
+TABLE_PAGE_TAIL = "</body></html>"
+
+def iter_table_page(table_fragments):
+    """Envuelve los fragmentos de la tabla en una página HTML mínima (abrible en navegador)."""
+    yield TABLE_PAGE_HEAD
+    yield from table_fragments
+    yield TABLE_PAGE_TAIL
+
+def write_fragments(fragments, sink, buffer_size=1 << 16):
+    """Vuelca fragmentos a cualquier objeto con .write() (archivo, io.StringIO, respuesta HTTP) en bloques."""
+    buf, size = [], 0
+    for frag in fragments:
+        buf.append(frag)
+        size += len(frag)
+        if size >= buffer_size:
+            sink.write("".join(buf))
+            buf, size = [], 0
+    if buf:
+        sink.write("".join(buf))
+
+def generar_tabla_html(df_disp, titulo, headers_by_logical, order_list, hidden_set, texto_extra, style, proteger_tabla,
+                       compact_html=False):
+    """Devuelve (html_completo, html_solo_tabla)."""
+    table_html = "".join(iter_table_html(df_disp, headers_by_logical, order_list, hidden_set, style, compact_html))
+    full_html = "".join((build_user_block(texto_extra, style, proteger_tabla),
+                         build_title_html(titulo, style, compact_html), table_html))
+    return full_html, table_html
+
+def render_outputs(df_disp, titulo, headers_by_logical, order_list, hidden_set, texto_extra, style, proteger_tabla,
+                   compact_html=False, cache=None, renderer=None):
+    """(html_completo, html_solo_tabla, página_solo_tabla), reutilizando `cache` si nada relevante cambió.
+
+    Con `renderer` (un IncrementalRenderer) los fallos de caché solo recalculan las secciones que cambiaron.
+    """
+    if renderer is None:
+        user_block = build_user_block(texto_extra, style, proteger_tabla)
+    else:
+        user_block = renderer.user_block(texto_extra, style, proteger_tabla)
+
+    def _render():
+        if renderer is None:
+            title_html = build_title_html(titulo, style, compact_html)
+            table_fragments = iter_table_html(df_disp, headers_by_logical, order_list, hidden_set, style, compact_html)
+        else:
+            title_html = renderer.title_html(titulo, style, compact_html)
+            table_fragments = renderer.iter_table_html(df_disp, headers_by_logical, order_list, hidden_set, style,
+                                                       compact_html)
+        return user_block + title_html, "".join(table_fragments)
+
+    if cache is None:
+        prefix, table_html = _render()
+    else:
+        key = (
+            dataframe_fingerprint(df_disp),
+            str(titulo),
+            tuple((lf, str(headers_by_logical.get(lf, lf))) for lf in order_list),
+            tuple(order_list),
+            frozenset(hidden_set),
+            tuple(sorted(style.items())),
+            hashlib.sha256(user_block.encode("utf-8")).hexdigest(),
+            bool(compact_html),
+        )
+        prefix, table_html = cache.get_or_compute(key, _render)
+    # la caché guarda la tabla una sola vez; el completo y la página se rearman en cada llamada
+    return prefix + table_html, table_html, "".join(iter_table_page([table_html]))
+
+# ====== Modo varias hojas: una tabla por hoja, renderizadas en paralelo ======
+def prepare_sheet(df_raw, tpl_map=None, enlace_conexion_global=""):
+    """(DataFrame listo para renderizar o None, campos faltantes) aplicando el mapeo a una hoja.
+
+    Las filas son las que la app muestra sin filtro de fechas: todo el rango del DateIndex más las
+    fechas no interpretadas; las de fecha vacía se descartan, igual que en la hoja activa.
+    """
+    map_cols = resolve_map_cols(list(df_raw.columns), tpl_map)
+    missing = missing_required(map_cols)
+    if missing:
+        return None, missing
+    df = normalize_date_column(apply_column_mapping(df_raw, map_cols))
+    df = df.iloc[DateIndex(df["Fecha de realización"]).select(include_unparsed=True)].copy()
+    return complete_link_columns(df, enlace_conexion_global), []
+
+def render_sheets(frames, max_workers=None, **render_kwargs):
+    """{hoja: (html_completo, html_solo_tabla, página_solo_tabla)} renderizando cada hoja en un hilo.
+
+    `render_kwargs` son los de render_outputs() salvo df_disp (no pasar un IncrementalRenderer:
+    no es seguro entre hilos; la OutputCache sí).
+    """
+    with ThreadPoolExecutor(max_workers=max_workers) as pool:
+        futures = {name: pool.submit(render_outputs, df, **render_kwargs) for name, df in frames.items()}
+        return {name: fut.result() for name, fut in futures.items()}
+
+OUTPUT_SUFFIXES = ("_completo.html", "_solo_tabla.txt", "_solo_tabla.html")
+
+def safe_filename(name):
+    """Nombre de hoja apto para archivo (sin separadores ni caracteres reservados)."""
+    return re.sub(r'[\\/:*?"<>|\s]+', "_", str(name)).strip("_") or "hoja"
+
+def zip_outputs(outputs_by_sheet, prefix="tabla_canvas"):
+    """Bytes de un .zip con las tres salidas de cada hoja: <prefijo>_<hoja>_completo.html, etc."""
+    buf = io.BytesIO()
+    with zipfile.ZipFile(buf, "w", zipfile.ZIP_DEFLATED) as zf:
+        for name, outputs in outputs_by_sheet.items():
+            for suffix, content in zip(OUTPUT_SUFFIXES, outputs):
+                zf.writestr(f"{prefix}_{safe_filename(name)}{suffix}", content)
+    return buf.getvalue()
+
+def html_size_report(html_normal, html_compacto):
+    """Bytes (UTF-8) de la salida normal vs. compacta y porcentaje ahorrado."""
+    before = len(html_normal.encode("utf-8"))
+    after = len(html_compacto.encode("utf-8"))
+    return {
+        "bytes_before": before,
+        "bytes_after": after,
+        "saved_pct": round(100.0 * (before - after) / before, 1) if before else 0.0,
+    }
+
+# ====== Copiado al portapapeles: una sola carga, comprimida ======
+def clipboard_payload(full_html, table_html):
+    """Datos de los botones de copiado: (base64 de gzip(UTF-8), byte donde empieza la tabla,
+    byte donde termina el completo).
+
+    El HTML completo termina con la tabla, así que se envía solo el completo y el navegador toma la
+    tabla desde ese byte; si no fuera así se envían completo + tabla, uno a continuación del otro.
+    """
+    if full_html.endswith(table_html):
+        data = full_html.encode("utf-8")
+        table_start = len(full_html[:len(full_html) - len(table_html)].encode("utf-8"))
+        full_end = len(data)
+    else:
+        full = full_html.encode("utf-8")
+        data = full + table_html.encode("utf-8")
+        table_start = full_end = len(full)
+    return base64.b64encode(gzip.compress(data, compresslevel=1, mtime=0)).decode("ascii"), table_start, full_end
+
+# ====== Visores de código: cabecera truncada y resaltado solo para tamaños razonables ======
+CODE_INLINE_MAX_BYTES = 128 * 1024      # hasta aquí el código se muestra completo directamente
+CODE_HIGHLIGHT_MAX_BYTES = 1024 * 1024  # por encima, el código completo se muestra sin resaltar
+CODE_HEAD_CHARS = 4_000
+
+def code_head(html_text, max_chars=CODE_HEAD_CHARS):
+    """Primeros ~max_chars caracteres del HTML, cortados después de un ">" para no partir una etiqueta."""
+    if len(html_text) <= max_chars:
+        return html_text
+    cut = html_text.rfind(">", 0, max_chars) + 1
+    return html_text[:cut or max_chars]
+
+PREVIEW_ROWS_DEFAULT = 200
+
+def preview_bounds(total_rows, page_size, page=1):
+    """(inicio, fin, páginas) de la página `page` (desde 1) de una vista previa de `page_size` filas."""
+    page_size = max(1, int(page_size))
+    pages = max(1, -(-int(total_rows) // page_size))
+    page = min(max(1, int(page)), pages)
+    start = (page - 1) * page_size
+    return start, min(start + page_size, int(total_rows)), pages
+
+def build_config_dict(map_cols, header_labels_by_logical, display_order, hidden_columns, titulo_principal,
+                      texto_html, primary, compact, font_family, tema_left, proteger_tabla,
+                      show_th_borders, show_td_borders, compact_html=False):
+    return {
+        "map_cols": map_cols,
+        "header_labels": header_labels_by_logical,
+        "display_order": display_order,
+        "hidden_columns": list(hidden_columns),
+        "titulo_principal": titulo_principal,
+        "texto_html": texto_html,
+        "primary_color": primary,
+        "compact_mode": compact,
+        "font_family": font_family,
+        "tema_align_left": tema_left,
+        "protect_table": proteger_tabla,
+        "show_th_borders": show_th_borders,
+        "show_td_borders": show_td_borders,
+        "compact_html": compact_html,
+    }
+
+def style_from_config(conf):
+    """make_style a partir de una plantilla JSON (mismos valores por defecto que la app)."""
+    return make_style(
+        primary=conf.get("primary_color", "#ba372a"),
+        compact=bool(conf.get("compact_mode", False)),
+        font_family=conf.get("font_family", "Arial, Helvetica, sans-serif"),
+        tema_left=bool(conf.get("tema_align_left", False)),
+        show_th_borders=bool(conf.get("show_th_borders", True)),
+        show_td_borders=bool(conf.get("show_td_borders", True)),
+    )
@@ -0,0 +1,79 @@
+"""Los motores de lectura de un mismo formato devuelven DataFrames idénticos.
+
+Se arma una programación chica (con las cabeceras reales, fechas mixtas y celdas vacías) en .xlsx,
+.ods y .csv, y se lee como la app: encabezados y luego solo las columnas mapeadas. Los motores que
+no están instalados se omiten; un formato con un solo motor disponible no tiene con qué comparar.
+"""
+import datetime as dt
+import importlib.util
+import os
+import sys
+
+import pandas as pd
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from conversor_core import (  # noqa: E402
+    DEFAULT_EXPECTED, ENGINE_MODULES, FORMAT_ENGINES, read_header, read_mapped_columns, resolve_map_cols,
+)
+
+def make_schedule():
+    """Programación de prueba: tildes, saltos de línea, fechas como datetime / texto / vacías."""
+    return pd.DataFrame({
+        DEFAULT_EXPECTED["Unidad Didáctica"]: ["Unidad 1", "Unidad 1", "Unidad 2", "Unidad 3"],
+        DEFAULT_EXPECTED["Tema del encuentro"]: ["Introducción", "Tema con\nsalto de línea", "Tutoría", "Cierre"],
+        DEFAULT_EXPECTED["Duración"]: ["2 horas", "1 hora", None, "2 horas"],
+        DEFAULT_EXPECTED["Fecha de realización"]: [dt.datetime(2026, 3, 2, 18), "09/03/2026", None, "por definir"],
+        DEFAULT_EXPECTED["Enlace de Conexión"]: ["https://zoom.us/j/1", None, "https://zoom.us/j/2", None],
+        DEFAULT_EXPECTED["Enlace de Grabación"]: [None, None, None, None],
+        "Observaciones": ["ñandú", None, "", "ok"],
+    })
+
+def installed(engine):
+    module = ENGINE_MODULES[engine]
+    return module is None or importlib.util.find_spec(module) is not None
+
+def read_as_app(path, fmt, engine):
+    colnames = list(read_header(path, engine=engine, fmt=fmt).columns)
+    return read_mapped_columns(path, colnames, resolve_map_cols(colnames), engine=engine, fmt=fmt)
+
+@pytest.fixture(scope="module")
+def sample_files(tmp_path_factory):
+    """{formato: ruta} de la misma programación escrita en cada formato de entrada."""
+    folder = tmp_path_factory.mktemp("muestras")
+    df = make_schedule()
+    paths = {"excel": folder / "programacion.xlsx", "csv": folder / "programacion.csv"}
+    df.to_excel(paths["excel"], index=False)
+    df.to_csv(paths["csv"], index=False)
+    if installed("odf"):   # escribir .ods requiere odfpy, aunque calamine pueda leerlo
+        paths["ods"] = folder / "programacion.ods"
+        df.to_excel(paths["ods"], index=False, engine="odf")
+    return paths
+
+@pytest.mark.parametrize("fmt", ["excel", "ods", "csv"])
+def test_engines_return_identical_frames(sample_files, fmt):
+    if fmt not in sample_files:
+        pytest.skip("odfpy no está instalado: no se puede generar el .ods")
+    engines = [e for e in FORMAT_ENGINES[fmt] if installed(e)]
+    if len(engines) < 2:
+        pytest.skip(f"solo hay un motor instalado para {fmt}: {', '.join(engines) or 'ninguno'}")
+    frames = {engine: read_as_app(sample_files[fmt], fmt, engine) for engine in engines}
+    for engine, df in frames.items():
+        assert df.attrs["read_engine"] == engine   # sin respaldo silencioso: se compara cada motor de verdad
+    (base_engine, base), *others = frames.items()
+    for engine, df in others:
+        pd.testing.assert_frame_equal(base, df, obj=f"{base_engine} vs {engine}")
+
+def test_csv_repeated_headers_match_c_parser(tmp_path):
+    """Con encabezados repetidos o vacíos pyarrow cede al motor C, y el resultado es el mismo."""
+    if not installed("pyarrow"):
+        pytest.skip("pyarrow no está instalado")
+    path = tmp_path / "repetidos.csv"
+    path.write_text("Tema,Otro,Otro,,Fecha\nA,x,y,z,01/03/2026\nB,x2,y2,z2,02/03/2026\n", encoding="utf-8")
+    colnames = list(read_header(path, fmt="csv").columns)
+    for name in ("Otro.1", "Unnamed: 3", "Tema"):
+        map_cols = {"Tema del encuentro": name}
+        got = read_mapped_columns(path, colnames, map_cols, engine="pyarrow", fmt="csv")
+        expected = read_mapped_columns(path, colnames, map_cols, engine="c", fmt="csv")
+        pd.testing.assert_frame_equal(got, expected)